@@ -1,10 +1,73 @@
 
+import copy
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt; plt.rcParams['figure.dpi'] = 600
+from matplotlib.collections import LineCollection
+from sklearn.base import clone
 from sklearn.tree import DecisionTreeClassifier
 from ipywidgets import interact
 
 
+# Fitted trees and their predicted surfaces, keyed by estimator parameters,
+# data fingerprint and plot limits, so moving an interact slider back to a
+# setting it has shown before only redraws.
+_SURFACE_CACHE = OrderedDict()
+_SURFACE_CACHE_SIZE = 256
+
+
+def data_fingerprint(X, y):
+    h = hashlib.sha1()
+    for arr in (X, y):
+        arr = np.ascontiguousarray(arr)
+        h.update(str((arr.shape, arr.dtype.str)).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def tree_boundaries(tree, xlim, ylim):
+    """Return the decision boundary segments of a fitted 2D tree"""
+    segments = []
+    stack = [(0, tuple(xlim), tuple(ylim))]
+    while stack:
+        i, xlim, ylim = stack.pop()
+        if i < 0:
+            continue
+        threshold = tree.threshold[i]
+        left, right = tree.children_left[i], tree.children_right[i]
+        if tree.feature[i] == 0:
+            segments.append([(threshold, ylim[0]), (threshold, ylim[1])])
+            stack.append((right, (threshold, xlim[1]), ylim))
+            stack.append((left, (xlim[0], threshold), ylim))
+        elif tree.feature[i] == 1:
+            segments.append([(xlim[0], threshold), (xlim[1], threshold)])
+            stack.append((right, xlim, (threshold, ylim[1])))
+            stack.append((left, xlim, (ylim[0], threshold)))
+    return segments
+
+
+def fit_surface(estimator, X, y, xlim, ylim):
+    """Fit the estimator and predict it on a grid, re-using earlier results"""
+    key = (type(estimator).__name__, repr(sorted(estimator.get_params().items())),
+           data_fingerprint(X, y), tuple(xlim), tuple(ylim))
+    if key in _SURFACE_CACHE:
+        _SURFACE_CACHE.move_to_end(key)
+        return _SURFACE_CACHE[key]
+
+    fitted = clone(estimator).fit(X, y)
+    xx, yy = np.meshgrid(np.linspace(*xlim, num=200),
+                         np.linspace(*ylim, num=200))
+    Z = fitted.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
+    segments = tree_boundaries(fitted.tree_, xlim, ylim)
+
+    _SURFACE_CACHE[key] = fitted, xx, yy, Z, segments
+    if len(_SURFACE_CACHE) > _SURFACE_CACHE_SIZE:
+        _SURFACE_CACHE.popitem(last=False)
+    return _SURFACE_CACHE[key]
+
+
 def visualize_tree(estimator, X, y, boundaries=True,
                    xlim=None, ylim=None, ax=None):
     ax = ax or plt.gca()
@@ -19,15 +82,15 @@ def visualize_tree(estimator, X, y, boundaries=True,
     if ylim is None:
         ylim = ax.get_ylim()
     
-    # fit the estimator
-    estimator.fit(X, y)
-    xx, yy = np.meshgrid(np.linspace(*xlim, num=200),
-                         np.linspace(*ylim, num=200))
-    Z = estimator.predict(np.c_[xx.ravel(), yy.ravel()])
+    # fit the estimator (or take it from the cache), leaving it fitted;
+    # the fitted attributes are copied so the cache entry is never shared
+    fitted, xx, yy, Z, segments = fit_surface(estimator, X, y, xlim, ylim)
+    for name, value in vars(fitted).items():
+        if name.endswith('_'):
+            setattr(estimator, name, copy.deepcopy(value))
 
     # Put the result into a color plot
     n_classes = len(np.unique(y))
-    Z = Z.reshape(xx.shape)
     contours = ax.contourf(xx, yy, Z, alpha=0.3,
                            levels=np.arange(n_classes + 1) - 0.5,
                            cmap='viridis', zorder=1)
@@ -35,26 +98,8 @@ def visualize_tree(estimator, X, y, boundaries=True,
     ax.set(xlim=xlim, ylim=ylim)
     
     # Plot the decision boundaries
-    def plot_boundaries(i, xlim, ylim):
-        if i >= 0:
-            tree = estimator.tree_
-        
-            if tree.feature[i] == 0:
-                ax.plot([tree.threshold[i], tree.threshold[i]], ylim, '-k', zorder=2)
-                plot_boundaries(tree.children_left[i],
-                                [xlim[0], tree.threshold[i]], ylim)
-                plot_boundaries(tree.children_right[i],
-                                [tree.threshold[i], xlim[1]], ylim)
-        
-            elif tree.feature[i] == 1:
-                ax.plot(xlim, [tree.threshold[i], tree.threshold[i]], '-k', zorder=2)
-                plot_boundaries(tree.children_left[i], xlim,
-                                [ylim[0], tree.threshold[i]])
-                plot_boundaries(tree.children_right[i], xlim,
-                                [tree.threshold[i], ylim[1]])
-            
     if boundaries:
-        plot_boundaries(0, xlim, ylim)
+        ax.add_collection(LineCollection(segments, colors='k', zorder=2))
 
 
 def plot_tree_interactive(X, y):
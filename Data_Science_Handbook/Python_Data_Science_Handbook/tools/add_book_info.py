@@ -3,7 +3,7 @@ import os
 import nbformat
 from nbformat.v4.nbbase import new_markdown_cell
 
-from generate_contents import iter_notebooks, NOTEBOOK_DIR
+from generate_contents import iter_notebooks, notebook_index, NOTEBOOK_DIR
 
 
 BOOK_COMMENT = "<!--BOOK_INFORMATION-->"
@@ -18,7 +18,12 @@ BOOK_INFO = BOOK_COMMENT + """
 
 
 def add_book_info():
+    index = notebook_index()
     for nb_name in iter_notebooks():
+        if index.entry(nb_name)['head'][:1] == [BOOK_INFO]:
+            print('- book info is up to date for {0}'.format(nb_name))
+            continue
+
         nb_file = os.path.join(NOTEBOOK_DIR, nb_name)
         nb = nbformat.read(nb_file, as_version=4)
 
@@ -30,7 +35,8 @@ def add_book_info():
         else:
             print('- inserting comment for {0}'.format(nb_name))
             nb.cells.insert(0, new_markdown_cell(BOOK_INFO))
-        nbformat.write(nb, nb_file)
+        index.write(nb_name, nb)
+    index.save()
 
 
 if __name__ == '__main__':
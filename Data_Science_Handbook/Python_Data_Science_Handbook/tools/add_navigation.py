@@ -5,7 +5,8 @@ from ipykernel import kernelspec as ks
 import nbformat
 from nbformat.v4.nbbase import new_markdown_cell
 
-from generate_contents import NOTEBOOK_DIR, REG, iter_notebooks, get_notebook_title
+from generate_contents import (NOTEBOOK_DIR, REG, iter_notebooks,
+                               get_notebook_title, notebook_index)
 
 
 def prev_this_next(it):
@@ -42,9 +43,15 @@ def iter_navbars():
 
 
 def write_navbars():
+    index = notebook_index()
     for nb_name, navbar in iter_navbars():
-        nb = nbformat.read(nb_name, as_version=4)
         nb_file = os.path.basename(nb_name)
+        entry = index.entry(nb_file)
+        if entry['head'][1:] == [navbar] and entry['tail'] == navbar:
+            print("- navbar is up to date for {0}".format(nb_file))
+            continue
+
+        nb = nbformat.read(nb_name, as_version=4)
         is_comment = lambda cell: cell.source.startswith(NAV_COMMENT)
 
         if is_comment(nb.cells[1]):
@@ -58,7 +65,8 @@ def write_navbars():
             nb.cells[-1].source = navbar
         else:
             nb.cells.append(new_markdown_cell(source=navbar))
-        nbformat.write(nb, nb_name)
+        index.write(nb_file, nb)
+    index.save()
 
 
 if __name__ == '__main__':
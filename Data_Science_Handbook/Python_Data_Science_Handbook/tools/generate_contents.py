@@ -1,7 +1,8 @@
 import os
 import re
 import itertools
-import nbformat
+
+from notebook_index import get_index
 
 NOTEBOOK_DIR = os.path.join(os.path.dirname(__file__), '..', 'notebooks')
 
@@ -19,14 +20,16 @@ def iter_notebooks():
     return sorted(nb for nb in os.listdir(NOTEBOOK_DIR) if REG.match(nb))
 
 
+def notebook_index():
+    return get_index(NOTEBOOK_DIR).build(iter_notebooks())
+
+
 def get_notebook_title(nb_file):
-    nb = nbformat.read(os.path.join(NOTEBOOK_DIR, nb_file), as_version=4)
-    for cell in nb.cells:
-        if cell.source.startswith('#'):
-            return cell.source[1:].splitlines()[0].strip()
+    return get_index(NOTEBOOK_DIR).title(nb_file)
 
 
 def gen_contents(directory=None):
+    notebook_index()
     for nb in iter_notebooks():
         if directory:
             nb_url = os.path.join(directory, nb)
@@ -46,6 +49,7 @@ def gen_contents(directory=None):
 
 def print_contents(directory=None):
     print('\n'.join(gen_contents(directory)))
+    get_index(NOTEBOOK_DIR).save()
 
 
 if __name__ == '__main__':
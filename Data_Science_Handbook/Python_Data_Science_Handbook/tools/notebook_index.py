@@ -0,0 +1,122 @@
+"""
+An on-disk index of notebook titles and the metadata the tools need.
+
+Each notebook is parsed at most once: its entry is kept in INDEX_FILE keyed by
+the file's modification time and size, and re-used as long as those are
+unchanged. A notebook whose modification time changed but whose content did
+not (e.g. after a fresh checkout) is recognised by its SHA-256 and not parsed
+again. generate_contents, add_navigation and add_book_info all read titles and
+cell sources from the same index, so a warm run parses no notebooks at all.
+"""
+import os
+import json
+import hashlib
+
+import nbformat
+
+
+INDEX_FILE = os.path.join(os.path.dirname(__file__), '.notebook_index.json')
+INDEX_VERSION = 1
+
+
+def notebook_title(nb):
+    for cell in nb.cells:
+        if cell.source.startswith('#'):
+            return cell.source[1:].splitlines()[0].strip()
+
+
+def notebook_entry(nb, stat, sha256):
+    sources = [cell.source for cell in nb.cells]
+    return {'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256,
+            'title': notebook_title(nb),
+            'n_cells': len(sources),
+            'head': sources[:2],
+            'tail': sources[-1] if sources else None}
+
+
+class NotebookIndex(object):
+    def __init__(self, notebook_dir, index_file=INDEX_FILE):
+        self.notebook_dir = os.path.abspath(notebook_dir)
+        self.index_file = index_file
+        self.entries = self._load()
+        self.parsed = 0
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if (index.get('version') != INDEX_VERSION or
+                index.get('notebook_dir') != self.notebook_dir):
+            return {}
+        return index['entries']
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': INDEX_VERSION,
+                       'notebook_dir': self.notebook_dir,
+                       'entries': self.entries}, f)
+        os.replace(tmp_file, self.index_file)
+        self._dirty = False
+
+    def entry(self, nb_name):
+        """Return the index entry of a notebook, parsing it only if it changed"""
+        path = os.path.join(self.notebook_dir, nb_name)
+        stat = os.stat(path)
+        entry = self.entries.get(nb_name)
+        if (entry and entry['mtime_ns'] == stat.st_mtime_ns and
+                entry['size'] == stat.st_size):
+            return entry
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if entry and entry['sha256'] == sha256:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        else:
+            nb = nbformat.reads(data.decode('utf-8'), as_version=4)
+            entry = notebook_entry(nb, stat, sha256)
+            self.parsed += 1
+        self.entries[nb_name] = entry
+        self._dirty = True
+        return entry
+
+    def title(self, nb_name):
+        return self.entry(nb_name)['title']
+
+    def build(self, nb_names):
+        """Bring the entries of all the given notebooks up to date in one pass"""
+        for nb_name in nb_names:
+            self.entry(nb_name)
+        for nb_name in list(self.entries):
+            if not os.path.exists(os.path.join(self.notebook_dir, nb_name)):
+                del self.entries[nb_name]
+                self._dirty = True
+        return self
+
+    def write(self, nb_name, nb):
+        """Write a notebook and record its new entry without parsing it again"""
+        path = os.path.join(self.notebook_dir, nb_name)
+        nbformat.write(nb, path)
+        with open(path, 'rb') as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+        self.entries[nb_name] = notebook_entry(nb, os.stat(path), sha256)
+        self._dirty = True
+
+
+_INDEXES = {}
+
+
+def get_index(notebook_dir):
+    """Return the process-wide index of a notebook directory"""
+    notebook_dir = os.path.abspath(notebook_dir)
+    if notebook_dir not in _INDEXES:
+        _INDEXES[notebook_dir] = NotebookIndex(notebook_dir)
+    return _INDEXES[notebook_dir]
@@ -1,10 +1,22 @@
 """
 This script copies all notebooks from the book into the website directory, and
 creates pages which wrap them and link together.
+
+Copies are incremental: the SHA-256 of every source notebook and figure is
+kept in a manifest, and only sources that changed since the last run (or whose
+output is missing) are copied and re-rendered. A notebook's hash also covers
+the notebook and figure names it mentions, so adding or removing one of those
+re-renders the pages that link to it. Notebooks are rendered on a
+pool of worker processes. Use --force to rebuild everything.
 """
 import os
-import nbformat
+import json
 import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import nbformat
 
 PAGEFILE = """title: {title}
 url:
@@ -30,82 +42,177 @@ def abspath_from_here(*args):
 NB_SOURCE_DIR = abspath_from_here('..', 'notebooks')
 NB_DEST_DIR = abspath_from_here('content', 'notebooks')
 PAGE_DEST_DIR = abspath_from_here('content', 'pages')
-
-
-def copy_notebooks():
+FIG_SOURCE_DIR = abspath_from_here('..', 'notebooks', 'figures')
+FIG_DEST_DIR = abspath_from_here('content', 'figures')
+MANIFEST_FILE = abspath_from_here('content', '.copy_manifest.json')
+
+# Bump when the rendering below changes, so every page is rebuilt once
+RENDER_VERSION = 1
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    tmp_file = MANIFEST_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+
+def render_hash(path, name_map, figure_map):
+    """Hash what a rendered page depends on: its notebook, the templates, and
+    the notebook and figure names that its links are rewritten against"""
+    with open(path, 'rb') as f:
+        source = f.read()
+    text = source.decode('utf-8')
+    digest = hashlib.sha256(source)
+    links = [name for name in sorted(name_map) + sorted(figure_map) if name in text]
+    for item in [RENDER_VERSION, PAGEFILE, INTRO_TEXT] + links:
+        digest.update(b'\0' + str(item).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def sync_figures(old_hashes, force=False):
+    """Copy new and changed figures, and remove figures deleted from the source"""
+    if not os.path.exists(FIG_DEST_DIR):
+        os.makedirs(FIG_DEST_DIR)
+    hashes = {}
+    counts = {'copied': 0, 'skipped': 0, 'removed': 0}
+    for fig in sorted(os.listdir(FIG_SOURCE_DIR)):
+        source = os.path.join(FIG_SOURCE_DIR, fig)
+        if not os.path.isfile(source):
+            continue
+        dest = os.path.join(FIG_DEST_DIR, fig)
+        hashes[fig] = file_hash(source)
+        if not force and old_hashes.get(fig) == hashes[fig] and os.path.exists(dest):
+            counts['skipped'] += 1
+        else:
+            shutil.copy2(source, dest)
+            counts['copied'] += 1
+    for fig in os.listdir(FIG_DEST_DIR):
+        if fig not in hashes:
+            os.remove(os.path.join(FIG_DEST_DIR, fig))
+            counts['removed'] += 1
+    return hashes, counts
+
+
+def render_notebook(nb, name_map, figure_map):
+    base, ext = os.path.splitext(nb)
+    content = nbformat.read(os.path.join(NB_SOURCE_DIR, nb),
+                            as_version=4)
+
+    if nb == 'Index.ipynb':
+        # content[0] is the title
+        # content[1] is the cover image
+        # content[2] is the license
+        cells = '1:'
+        template = 'page'
+        title = 'Python Data Science Handbook'
+        content.cells[2].source = INTRO_TEXT
+    else:
+        # content[0] is the book information
+        # content[1] is the navigation bar
+        # content[2] is the title
+        cells = '2:'
+        template = 'booksection'
+        title = content.cells[2].source
+        if not title.startswith('#') or len(title.splitlines()) > 1:
+            raise ValueError('title not found in third cell')
+        title = title.lstrip('#').strip()
+
+        # put nav below title
+        content.cells.insert(0, content.cells.pop(2))
+
+    # Replace internal URLs and figure links in notebook
+    for cell in content.cells:
+        if cell.cell_type == 'markdown':
+            for nbname, htmlname in name_map.items():
+                if nbname in cell.source:
+                    cell.source = cell.source.replace(nbname, htmlname)
+            for figname, newfigname in figure_map.items():
+                if figname in cell.source:
+                    cell.source = cell.source.replace(figname, newfigname)
+        if cell.source.startswith("<!--NAVIGATION-->"):
+            # Undo replacement of notebook link in the colab badge
+            cell.source = nb.join(cell.source.rsplit(name_map[nb], 1))
+
+    nbformat.write(content, os.path.join(NB_DEST_DIR, nb))
+
+    pagefile = os.path.join(PAGE_DEST_DIR, base + '.md')
+    htmlfile = base.lower() + '.html'
+    with open(pagefile, 'w') as f:
+        f.write(PAGEFILE.format(title=title,
+                                htmlfile=htmlfile,
+                                notebook_file=nb,
+                                template=template,
+                                cells=cells))
+
+    return nb
+
+
+def copy_notebooks(force=False, jobs=None):
     if not os.path.exists(NB_DEST_DIR):
         os.makedirs(NB_DEST_DIR)
     if not os.path.exists(PAGE_DEST_DIR):
         os.makedirs(PAGE_DEST_DIR)
 
+    manifest = {} if force else load_manifest()
     nblist = sorted(nb for nb in os.listdir(NB_SOURCE_DIR)
                     if nb.endswith('.ipynb'))
     name_map = {nb: nb.rsplit('.', 1)[0].lower() + '.html'
                 for nb in nblist}
 
-    figsource = abspath_from_here('..', 'notebooks', 'figures')
-    figdest = abspath_from_here('content', 'figures')
-
-    if os.path.exists(figdest):
-        shutil.rmtree(figdest)
-    shutil.copytree(figsource, figdest)
+    fig_hashes, fig_counts = sync_figures(manifest.get('figures', {}), force)
 
-    figurelist = os.listdir(abspath_from_here('content', 'figures'))
+    figurelist = sorted(fig_hashes)
     figure_map = {os.path.join('figures', fig) : os.path.join('/PythonDataScienceHandbook/figures', fig)
                   for fig in figurelist}
 
-    for nb in nblist:
-        base, ext = os.path.splitext(nb)
-        print('-', nb)
-
-        content = nbformat.read(os.path.join(NB_SOURCE_DIR, nb),
-                                as_version=4)
-
-        if nb == 'Index.ipynb':
-            # content[0] is the title
-            # content[1] is the cover image
-            # content[2] is the license
-            cells = '1:'
-            template = 'page'
-            title = 'Python Data Science Handbook'
-            content.cells[2].source = INTRO_TEXT
-        else:
-            # content[0] is the book information
-            # content[1] is the navigation bar
-            # content[2] is the title
-            cells = '2:'
-            template = 'booksection'
-            title = content.cells[2].source
-            if not title.startswith('#') or len(title.splitlines()) > 1:
-                raise ValueError('title not found in third cell')
-            title = title.lstrip('#').strip()
-
-            # put nav below title
-            content.cells.insert(0, content.cells.pop(2))
-
-        # Replace internal URLs and figure links in notebook
-        for cell in content.cells:
-            if cell.cell_type == 'markdown':
-                for nbname, htmlname in name_map.items():
-                    if nbname in cell.source:
-                        cell.source = cell.source.replace(nbname, htmlname)
-                for figname, newfigname in figure_map.items():
-                    if figname in cell.source:
-                        cell.source = cell.source.replace(figname, newfigname)
-            if cell.source.startswith("<!--NAVIGATION-->"):
-                # Undo replacement of notebook link in the colab badge
-                cell.source = nb.join(cell.source.rsplit(name_map[nb], 1))
-
-        nbformat.write(content, os.path.join(NB_DEST_DIR, nb))
-
-        pagefile = os.path.join(PAGE_DEST_DIR, base + '.md')
-        htmlfile = base.lower() + '.html'
-        with open(pagefile, 'w') as f:
-            f.write(PAGEFILE.format(title=title,
-                                    htmlfile=htmlfile,
-                                    notebook_file=nb,
-                                    template=template,
-                                    cells=cells))
+    # A page is re-rendered when its notebook changed, its output is missing,
+    # or a notebook or figure it links to was added or removed
+    old_hashes = manifest.get('notebooks', {})
+    nb_hashes = {nb: render_hash(os.path.join(NB_SOURCE_DIR, nb), name_map, figure_map)
+                 for nb in nblist}
+    stale = [nb for nb in nblist
+             if old_hashes.get(nb) != nb_hashes[nb]
+             or not os.path.exists(os.path.join(NB_DEST_DIR, nb))
+             or not os.path.exists(os.path.join(PAGE_DEST_DIR, os.path.splitext(nb)[0] + '.md'))]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(render_notebook, nb, name_map, figure_map)
+                   for nb in stale]
+        for future in futures:
+            print('-', future.result())
+
+    save_manifest({'notebooks': nb_hashes, 'figures': fig_hashes})
+    print('notebooks: {0} rebuilt, {1} skipped; figures: {copied} copied, '
+          '{skipped} skipped, {removed} removed'.format(
+              len(stale), len(nblist) - len(stale), **fig_counts))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true',
+                        help='copy and re-render everything, ignoring the manifest')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    return parser.parse_args(argv)
+
 
 if __name__ == '__main__':
-    copy_notebooks()
+    args = parse_args()
+    copy_notebooks(force=args.force, jobs=args.jobs)
@@ -1,4 +1,35 @@
 import streamlit as st
+import pandas as pd
+from batch_prepare import parse_sort_keys
+from watch_folder import ALLOW_WATCH_FOLDER_PANEL, DEFAULT_INTERVAL_SECONDS, get_watch_folder_ingester
+
+# Function to control the watch-folder ingestion service and show what it ingested
+def display_watch_folder_panel():
+    ingester = get_watch_folder_ingester()
+    with st.expander("Watch Folder Ingestion", expanded=ingester.is_running()):
+        st.write("New or changed exports dropped into the folder are prepared with the saved datatype map and saved as snapshots for the analyzer.")
+        watch_dir = st.text_input("Folder to watch", value=str(ingester.watch_dir or "Watch_Folder"))
+        cols = st.columns(2)
+        sort_by = cols[0].text_input("Sort by columns (e.g. Opened,-Trade)", value=','.join(('' if asc else '-') + col for col, asc in ingester.sort_keys))
+        interval = cols[1].number_input("Seconds between polls", min_value=1, value=int(ingester.interval or DEFAULT_INTERVAL_SECONDS))
+
+        cols = st.columns(3)
+        if cols[0].button("Start Watching"):
+            try:
+                ingester.start(watch_dir, sort_keys=parse_sort_keys(sort_by), interval=interval)
+            except Exception as e:
+                st.error(f"Error starting watch folder: {str(e)}")
+        if cols[1].button("Stop Watching"):
+            ingester.stop()
+        if cols[2].button("Poll Now", disabled=not ingester.is_running()):
+            try:
+                ingester.poll()
+            except Exception as e:
+                st.error(f"Error polling watch folder: {str(e)}")
+
+        st.write(ingester.status())
+        if ingester.results:
+            st.dataframe(pd.DataFrame(ingester.results)[['ingested', 'file', 'status', 'rows', 'outputs', 'error']], use_container_width=True)
 
 def main():
     st.title("Trade Performance Analyzer")
@@ -8,5 +39,9 @@ def main():
         # Replace st.experimental_set_query_params with st.set_query_params
         st.set_query_params(page="Prepare Data")
 
+    # The watch-folder controls read server folders, so they are opt-in
+    if ALLOW_WATCH_FOLDER_PANEL:
+        display_watch_folder_panel()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
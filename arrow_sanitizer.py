@@ -0,0 +1,92 @@
+"""
+Arrow-safe sanitizer for object columns holding mixed Python types.
+
+Streamlit serializes every grid through Arrow, which needs one type per
+column; an object column mixing e.g. datetimes and strings fails with
+"Expected bytes, got a 'datetime.datetime' object". Mixed columns are found
+with pandas' compiled type inference (one C-level pass per object column, no
+per-cell Python), then coerced to a single type by policy:
+
+    'auto'     - number if every non-missing value converts to a number,
+                 else datetime if every one converts to a date, else string
+    'number'   - number; values that do not convert become missing
+    'datetime' - datetime; values that do not convert become missing
+    'string'   - string; missing values stay missing
+
+Each coerced column is logged with the number of cells whose value changed.
+"""
+
+import logging
+
+import pandas as pd
+
+# Inferred kinds that mix Python types within one column
+MIXED_KINDS = {'mixed', 'mixed-integer', 'mixed-integer-float'}
+
+# Function to list the object columns holding mixed Python types, with their inferred kind
+def find_mixed_columns(df):
+    mixed = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in MIXED_KINDS:
+            mixed[col] = kind
+    return mixed
+
+# Function to convert a column to the given target type
+def coerce_column(series, target):
+    if target == 'number':
+        return pd.to_numeric(series, errors='coerce')
+    if target == 'datetime':
+        return pd.to_datetime(series, errors='coerce', format='mixed')
+    return series.astype('string')
+
+# Function to pick the target type for a mixed column under the 'auto' policy
+# Returns the target and its already-converted column, so no conversion runs twice.
+def auto_coerce_column(series):
+    present = series.notna()
+    numbers = pd.to_numeric(series, errors='coerce')
+    if not (present & numbers.isna()).any():
+        return 'number', numbers
+    # Numbers would be read as epoch offsets, so dates are tried only when no value is numeric
+    if not numbers.notna().any():
+        dates = pd.to_datetime(series, errors='coerce', format='mixed')
+        if not (present & dates.isna()).any():
+            return 'datetime', dates
+    return 'string', coerce_column(series, 'string')
+
+# Function to count cells whose value changed or was lost in a coercion
+def count_changed_cells(original, coerced):
+    present = original.notna()
+    lost = present & coerced.isna()
+    differs = present & coerced.notna() & (coerced.astype(object) != original)
+    return int((lost | differs).sum())
+
+# Function to make a DataFrame Arrow-compatible by coercing its mixed-type columns
+# policy is one of 'auto', 'number', 'datetime', 'string', or a {column: policy} dict
+# (columns missing from the dict use 'auto'). Returns (df, report): one report row
+# per coerced column. The input frame is not modified.
+def sanitize_for_arrow(df, policy='auto'):
+    mixed = find_mixed_columns(df)
+    if not mixed:
+        return df, []
+    coerced = {}
+    report = []
+    for col, kind in mixed.items():
+        original = df[col]
+        column_policy = policy.get(col, 'auto') if isinstance(policy, dict) else policy
+        try:
+            if column_policy == 'auto':
+                target, values = auto_coerce_column(original)
+            else:
+                target, values = column_policy, coerce_column(original, column_policy)
+        except Exception as e:
+            logging.error(f"Error coercing mixed-type column {col} to {column_policy}: {str(e)}; using string")
+            target, values = 'string', coerce_column(original, 'string')
+        changed = count_changed_cells(original, values)
+        coerced[col] = values
+        report.append({'Column': col, 'Detected': kind, 'Coerced_To': target, 'Cells_Changed': changed})
+        logging.info(f"Coerced mixed-type column {col} ({kind}) to {target}; {changed} cells changed")
+    return df.assign(**coerced), report
@@ -0,0 +1,150 @@
+"""
+Headless batch runner for the Prepare Data pipeline.
+
+Runs every XLSX/CSV export in a directory through the same steps as the
+Prepare Data page (read -> clean column names -> convert datatypes -> parse
+Description -> sort -> save) using a datatype map saved from the page, one
+file per worker process.
+
+Usage:
+    python batch_prepare.py exports/ --dtype-map Cleaned_Datasets/datatype_map.json --sort-by Opened,Trade --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import prepare_data
+from excel_export import write_xlsx_streaming
+
+# Function to point worker-process logging at the run logfile
+def init_worker(log_file):
+    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Function to run one export file through the prepare pipeline
+def process_file(path, datatype_map, sort_keys, parse_description, snapshot_only, current_datetime):
+    path = Path(path)
+    started = time.perf_counter()
+    result = {'file': str(path), 'status': 'ok', 'rows': 0, 'columns': 0, 'outputs': [], 'error': None}
+    try:
+        pipeline = prepare_data.build_prepare_pipeline()
+        params = {'dataset_version': prepare_data.file_version(path), 'file_name': path.name, '_source': path}
+        df, mixed_report = pipeline.run('sanitize', **params)
+        result['mixed_type_columns'] = {row['Column']: row['Coerced_To'] for row in mixed_report}
+        missing = [col for col in datatype_map if col not in df.columns]
+        if missing:
+            logging.warning(f"{path.name}: columns in datatype map not found in file: {missing}")
+        params['datatype_map'] = {col: t for col, t in datatype_map.items() if col in df.columns}
+        params['parse_description'] = parse_description
+        params['sort_keys'] = sort_keys
+        _, conversion_errors = pipeline.run('convert', **params)
+        result['conversion_errors'] = conversion_errors
+        df = pipeline.run('sort', **params)
+        quality_summary, _ = pipeline.run('quality', **params)
+        result['quality_violations'] = {row.Rule: int(row.Violations) for row in quality_summary.itertuples() if pd.notna(row.Violations) and row.Violations}
+
+        if snapshot_only:
+            metadata = prepare_data.dataset_metadata(params['datatype_map'], sort_keys, len(df), params['dataset_version'])
+            manifest_path = prepare_data.save_dataset_snapshot(df, f"trade_performance_dataset_cleaned_{path.stem}_{current_datetime}", metadata, show_messages=False)
+            if manifest_path is None:
+                raise RuntimeError(f"could not save snapshot of {path.name}")
+            outputs = [str(manifest_path)]
+        else:
+            csv_filename, xlsx_filename = prepare_data.cleaned_dataset_filenames(current_datetime, prefix=f"trade_performance_dataset_cleaned_{path.stem}")
+            if not prepare_data.save_sorted_dataset(df, csv_filename, show_messages=False):
+                raise RuntimeError(f"could not write {csv_filename}")
+            write_xlsx_streaming(df, xlsx_filename)
+            prepare_data.save_dataset_metadata(csv_filename, params['datatype_map'], sort_keys, len(df), params['dataset_version'])
+            outputs = [str(csv_filename), str(xlsx_filename)]
+
+        result.update(rows=len(df), columns=len(df.columns), outputs=outputs)
+        logging.info(f"Prepared {path.name}: {len(df)} rows written to {', '.join(outputs)}")
+    except Exception as e:
+        result.update(status='error', error=str(e))
+        logging.error(f"Error preparing {path.name}: {str(e)}")
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+# Function to list the export files in a directory
+def find_export_files(input_dir, pattern):
+    return sorted(p for p in Path(input_dir).glob(pattern) if p.suffix in ('.xlsx', '.csv') and p.is_file())
+
+# Function to write the run summary next to the run logfile
+def write_run_summary(results, summary_filename):
+    summary = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'files': len(results),
+        'succeeded': sum(r['status'] == 'ok' for r in results),
+        'failed': sum(r['status'] != 'ok' for r in results),
+        'rows': sum(r['rows'] for r in results),
+        'results': results,
+    }
+    with open(summary_filename, 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+# Function to parse command-line arguments
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Prepare Data pipeline headless over a directory of exports.")
+    parser.add_argument('input_dir', help="Directory containing XLSX/CSV exports")
+    parser.add_argument('--dtype-map', default=str(prepare_data.DATATYPE_MAP_FILE),
+                        help="JSON datatype map saved from the Prepare Data page")
+    parser.add_argument('--pattern', default='*', help="Glob pattern for files in input_dir (default: all XLSX/CSV files)")
+    parser.add_argument('--sort-by', default='',
+                        help="Comma-separated sort columns, prefix with '-' for descending (e.g. Opened,-Trade)")
+    parser.add_argument('--no-parse-description', action='store_true',
+                        help="Do not add the columns parsed from Description")
+    parser.add_argument('--snapshot-only', action='store_true',
+                        help="Save deduplicated snapshots instead of full CSV and XLSX files")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    return parser.parse_args(argv)
+
+# Function to turn "Opened,-Trade" into [['Opened', True], ['Trade', False]]
+def parse_sort_keys(sort_by):
+    return [[key.lstrip('-'), not key.startswith('-')] for key in (k.strip() for k in sort_by.split(',')) if key]
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    log_file = prepare_data.setup_logging(prefix="batch_prepare_log")
+
+    try:
+        datatype_map = prepare_data.load_datatype_map(args.dtype_map)
+    except Exception as e:
+        logging.error(f"Error loading datatype map from {args.dtype_map}: {str(e)}")
+        print(f"Error loading datatype map from {args.dtype_map}: {str(e)}", file=sys.stderr)
+        return 2
+
+    sort_keys = parse_sort_keys(args.sort_by)
+    files = find_export_files(args.input_dir, args.pattern)
+    if not files:
+        print(f"No XLSX or CSV files found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
+    workers = max(1, min(args.workers or 1, len(files)))
+    logging.info(f"Preparing {len(files)} files from {args.input_dir} with {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(log_file,)) as executor:
+        results = list(executor.map(process_file, files, [datatype_map] * len(files), [sort_keys] * len(files),
+                                    [not args.no_parse_description] * len(files), [args.snapshot_only] * len(files),
+                                    [current_datetime] * len(files)))
+
+    summary_filename = prepare_data.LOGFILES_DIR / f"batch_prepare_summary_{current_datetime}.json"
+    summary = write_run_summary(results, summary_filename)
+    logging.info(f"Batch run finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+
+    for r in results:
+        print(f"{r['status']:>5}  {r['rows']:>8} rows  {r['seconds']:>7.2f}s  {r['file']}" + (f"  ({r['error']})" if r['error'] else ""))
+    print(f"Summary written to {summary_filename}, log written to {log_file}")
+    return 0 if summary['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: st.cache_data lookups keyed by a whole DataFrame versus a
+dataset-version token.
+
+Passing a DataFrame to an st.cache_data function makes Streamlit hash the
+frame's contents on every call just to find the cache entry. Passing a
+version token (and the frame as an underscore argument, which Streamlit does
+not hash) makes the lookup cost constant.
+
+Run from the repository root:
+    python -m benchmarks.bench_cache_keys --rows 100000 1000000 --repeat 20
+
+Outside `streamlit run`, Streamlit logs "No runtime found" warnings to stderr;
+they do not affect the timings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import Pipeline, Stage
+from prepare_data import clean_column_names
+
+# Both functions return only the cleaned column names, so a cache hit measures the
+# key lookup rather than st.cache_data unpickling a copy of a large return value.
+@st.cache_data
+def clean_columns_by_frame(df):
+    return list(clean_column_names(df).columns)
+
+@st.cache_data
+def clean_columns_by_version(dataset_version, _df):
+    return list(clean_column_names(_df).columns)
+
+# Function to build a trade-like frame with the given number of rows
+def make_trades(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    opened = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1800, rows), unit='D')
+    return pd.DataFrame({
+        'Trade': np.arange(rows),
+        'Opened': opened,
+        'Closed': opened + pd.to_timedelta(rng.integers(1, 10, rows), unit='D'),
+        'Description': rng.choice(['TRADE 071- 20Dec 2024 SPX A14', '*TRADE 072- 17Jan 2025 SPX A14-PT'], rows),
+        'Profit Loss': rng.normal(100, 50, rows).round(2),
+        'Maximum Margin': rng.integers(2000, 4000, rows),
+    })
+
+# Function to time repeated cache hits and return the median seconds per call
+def time_hits(func, args, repeat):
+    func(*args)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline = Pipeline([
+        Stage('read', lambda dataset_version, df: df, params=('dataset_version', '_df')),
+        Stage('clean_columns', clean_column_names, inputs=('read',)),
+    ])
+
+    print(f"{'rows':>10}  {'hash frame (ms)':>16}  {'version token (ms)':>19}  {'pipeline (ms)':>14}  {'speedup':>8}")
+    for rows in args.rows:
+        df = make_trades(rows)
+        by_frame = time_hits(clean_columns_by_frame, (df,), args.repeat)
+        by_version = time_hits(clean_columns_by_version, (f"bench:{rows}", df), args.repeat)
+        by_pipeline = time_hits(lambda: pipeline.run('clean_columns', dataset_version=f"bench:{rows}", _df=df), (), args.repeat)
+        print(f"{rows:>10}  {by_frame * 1000:>16.2f}  {by_version * 1000:>19.3f}  {by_pipeline * 1000:>14.3f}  {by_frame / by_version:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
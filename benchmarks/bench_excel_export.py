@@ -0,0 +1,80 @@
+"""
+Benchmark: XLSX export through DataFrame.to_excel (default openpyxl engine)
+versus excel_export.write_xlsx_streaming (XlsxWriter constant_memory mode).
+
+Reports wall time and peak Python heap (tracemalloc) for each writer. Each
+writer runs in a fresh process so one run's allocations do not affect the next.
+
+Run from the repository root:
+    python -m benchmarks.bench_excel_export --rows 10000 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from excel_export import write_xlsx_streaming
+
+# Function to build a cleaned trade-like frame with the given number of rows
+def make_trades(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    opened = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1800, rows), unit='D')
+    margin = rng.integers(2000, 4000, rows)
+    profit_loss = rng.normal(100, 50, rows).round(2)
+    return pd.DataFrame({
+        'Trade': np.arange(rows),
+        'Opened': opened,
+        'Closed': opened + pd.to_timedelta(rng.integers(1, 10, rows), unit='D'),
+        'DIT': rng.integers(1, 10, rows),
+        'Description': rng.choice(['TRADE 071- 20Dec 2024 SPX A14', '*TRADE 072- 17Jan 2025 SPX A14-PT'], rows),
+        'Symbol': 'SPX',
+        'Maximum_Margin': margin,
+        'Profit_Loss': profit_loss,
+        'Yield_on_Max_Margin': (profit_loss / margin).round(4),
+    })
+
+# Function to run one writer into a temporary file
+def write(writer, df, filename):
+    if writer == 'to_excel':
+        df.to_excel(filename, index=False)
+    else:
+        write_xlsx_streaming(df, filename)
+
+# Function to run one writer and return (seconds, peak MiB, file MiB)
+# Time and memory are measured in separate passes because tracemalloc slows
+# allocation-heavy writers down far more than others.
+def measure(writer, rows):
+    df = make_trades(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'bench.xlsx')
+        started = time.perf_counter()
+        write(writer, df, filename)
+        seconds = time.perf_counter() - started
+
+        tracemalloc.start()
+        write(writer, df, filename)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return seconds, peak / 2**20, os.path.getsize(filename) / 2**20
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'writer':>10}  {'seconds':>8}  {'peak MiB':>9}  {'file MiB':>9}")
+    with get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        for rows in args.rows:
+            for writer in ('to_excel', 'streaming'):
+                seconds, peak, size = pool.apply(measure, (writer, rows))
+                print(f"{rows:>9}  {writer:>10}  {seconds:>8.2f}  {peak:>9.1f}  {size:>9.2f}")
+
+if __name__ == "__main__":
+    main()
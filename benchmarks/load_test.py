@@ -0,0 +1,269 @@
+"""
+Load test: many simulated sessions driving the Streamlit pages at once.
+
+Each simulated session is a headless Streamlit AppTest of streamlit_app.py
+that navigates to a page and replays a scripted list of interactions
+(choosing a source file, changing a datatype, previewing, loading and
+analyzing a saved dataset, switching granularity, ...). All sessions live in
+one process, so they share the process-wide caches exactly as sessions of
+one `streamlit run` server do. AppTest swaps a process-global mock runtime
+in for every run, so reruns cannot overlap on threads; instead the sessions
+are interleaved, each advancing one interaction in turn, which is the order
+a busy server sees reruns arrive in. Every interaction's rerun is timed, and
+process memory (RSS) is sampled while the test runs.
+
+AppTest always reruns the whole script. A browser reruns only the fragment
+a widget belongs to (st.fragment), so by default the harness simulates this:
+a change to a widget inside a fragment is replayed as a rerun of that
+fragment, keeping the rest of the page from the previous run. The simulation
+patches Streamlit internals that are not public API (app_test.LocalScriptRunner,
+the runner's request queue and its forward-message queue), so it may break
+with a Streamlit upgrade; when those internals are missing the harness falls
+back to full reruns. Fragment timings are therefore of an in-process replay,
+not of a browser's fragment rerun over a server connection, which adds
+websocket and rendering time; they compare fragment against full reruns of
+the same pages, not against production latency. --full-reruns turns the
+simulation off.
+
+AppTest cannot upload files, so Prepare Data sessions use the page's
+"Local file path" source, which the harness enables by setting
+PREPARE_DATA_ALLOW_LOCAL_FILES=1 for its own process.
+
+Run from the repository root:
+    python -m benchmarks.load_test --sessions 20 --rounds 3 --export A14-Class-Trade-Transaction-Performance-History-Last-Trade-2025.01.14.xlsx
+
+Outside `streamlit run`, Streamlit logs "No runtime found" warnings to stderr;
+they do not affect the timings.
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# Internal to Streamlit; without it fragment reruns cannot be simulated
+try:
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+except ImportError:
+    ScriptRequests = None
+
+# AppTest resolves relative script paths against the calling file, so give it an absolute one
+APP_FILE = str(Path(__file__).resolve().parent.parent / 'streamlit_app.py')
+
+# Function to read this process's current resident memory in MiB
+def current_rss_mib():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        # Without /proc, fall back to the peak, which ru_maxrss reports in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+# A background thread sampling process memory until stopped
+class MemorySampler:
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(current_rss_mib())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return {'Start_MiB': round(self.samples[0], 1), 'Peak_MiB': round(max(self.samples), 1), 'End_MiB': round(self.samples[-1], 1)}
+
+# A script runner that can rerun a single fragment, as the browser requests
+# Sessions run one at a time, so the fragment to rerun is set on the class before each run.
+# Each session's last messages are kept, so elements outside the fragment carry over.
+class FragmentScriptRunner(LocalScriptRunner):
+    fragment_id = None
+    widget_fragments = {}
+    session_messages = {}
+
+    def __init__(self, script_path, session_state, *args, **kwargs):
+        super().__init__(script_path, session_state, *args, **kwargs)
+        self.session_key = id(session_state)
+        if FragmentScriptRunner.fragment_id:
+            # Drop the full run LocalScriptRunner queues on creation; run() then requests the fragment
+            self._requests = ScriptRequests()
+            self.forward_msg_queue._queue = list(self.session_messages.get(self.session_key, []))
+
+    def request_rerun(self, rerun_data):
+        if FragmentScriptRunner.fragment_id:
+            rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=[FragmentScriptRunner.fragment_id])
+        return super().request_rerun(rerun_data)
+
+    # Function to return this run's messages, noting which fragment each widget belongs to
+    def forward_msgs(self):
+        msgs = super().forward_msgs()
+        self.session_messages[self.session_key] = list(msgs)
+        for msg in msgs:
+            if msg.HasField('delta') and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                widget_id = getattr(getattr(element, element.WhichOneof('type')), 'id', '')
+                if widget_id:
+                    self.widget_fragments[widget_id] = msg.delta.fragment_id
+        return msgs
+
+# Function to check that the Streamlit internals FragmentScriptRunner patches are still there
+def fragment_reruns_supported():
+    return (ScriptRequests is not None and hasattr(app_test, 'LocalScriptRunner')
+            and all(hasattr(LocalScriptRunner, name) for name in ('request_rerun', 'forward_msgs')))
+
+# Function to rerun after a widget changed: only its fragment, or the whole script
+def rerun(element, full_rerun=False):
+    FragmentScriptRunner.fragment_id = None if full_rerun else FragmentScriptRunner.widget_fragments.get(element.id)
+    try:
+        return element.run()
+    finally:
+        FragmentScriptRunner.fragment_id = None
+
+# Function to find a widget by its label
+def widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"no widget labelled {label!r}")
+
+# Function to time one interaction's rerun and record it, with any exception or st.error shown
+def timed(records, session, page, interaction, action):
+    started = time.perf_counter()
+    at = action()
+    seconds = time.perf_counter() - started
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    records.append({'Session': session, 'Page': page, 'Interaction': interaction, 'Seconds': seconds, 'Error': errors[0] if errors else None})
+    return at
+
+# Function to script a Prepare Data session, yielding after each interaction
+def prepare_data_session(session, rounds, export_path, records, timeout, full_reruns):
+    at = timed(records, session, 'Prepare Data', 'open_app', lambda: AppTest.from_file(APP_FILE, default_timeout=timeout).run())
+    yield
+    at = timed(records, session, 'Prepare Data', 'open_page', lambda: at.sidebar.radio[0].set_value('Prepare Data').run())
+    yield
+    at = timed(records, session, 'Prepare Data', 'choose_local_source', lambda: widget(at.radio, 'Source').set_value('Local file path').run())
+    yield
+    at = timed(records, session, 'Prepare Data', 'load_file', lambda: widget(at.text_input, 'Path to an XLSX or CSV file').set_value(export_path).run())
+    yield
+    for i in range(rounds):
+        new_type = 'float64' if i % 2 == 0 else 'int64'
+        at = timed(records, session, 'Prepare Data', 'change_dtype', lambda: rerun(widget(at.selectbox, 'Select datatype for DIT').set_value(new_type), full_reruns))
+        yield
+        at = timed(records, session, 'Prepare Data', 'sort_dataset',
+                   lambda: rerun(widget(at.multiselect, 'Sort by columns (in priority order)').set_value(['Opened'] if i % 2 == 0 else []), full_reruns))
+        yield
+        at = timed(records, session, 'Prepare Data', 'preview', lambda: rerun(widget(at.button, 'Preview Data After Datatype Conversion').click(), full_reruns))
+        yield
+
+# Function to script an Analyze Trade Performance session, yielding after each interaction
+def analyze_session(session, rounds, records, timeout, full_reruns):
+    at = timed(records, session, 'Analyze', 'open_app', lambda: AppTest.from_file(APP_FILE, default_timeout=timeout).run())
+    yield
+    at = timed(records, session, 'Analyze', 'open_page', lambda: at.sidebar.radio[0].set_value('Analyze Trade Performance').run())
+    yield
+    at = timed(records, session, 'Analyze', 'load_dataset', lambda: widget(at.button, 'Load Saved Dataset').click().run())
+    yield
+    at = timed(records, session, 'Analyze', 'analyze_trades', lambda: widget(at.button, 'Analyze Trades').click().run())
+    yield
+    for i in range(rounds):
+        for granularity in ['Daily', 'Weekly', 'Monthly', 'Trade']:
+            at = timed(records, session, 'Analyze', 'change_granularity', lambda: rerun(widget(at.radio, 'Granularity').set_value(granularity), full_reruns))
+            yield
+        date_column = 'Closed' if i % 2 == 0 else 'Opened'
+        at = timed(records, session, 'Analyze', 'change_date_column', lambda: rerun(widget(at.radio, 'Aggregate Profit/Loss by').set_value(date_column), full_reruns))
+        yield
+
+# Function to start one simulated session, alternating pages across sessions
+def start_session(session, args, records):
+    if session % 2 == 0 and args.export:
+        return prepare_data_session(session, args.rounds, args.export, records, args.timeout, args.full_reruns)
+    return analyze_session(session, args.rounds, records, args.timeout, args.full_reruns)
+
+# Function to run every session, advancing each by one interaction in turn
+# A session that raises is recorded and dropped; the others carry on.
+def run_sessions(args, records):
+    sessions = {session: start_session(session, args, records) for session in range(args.sessions)}
+    while sessions:
+        for session, steps in list(sessions.items()):
+            try:
+                next(steps)
+            except StopIteration:
+                del sessions[session]
+            except Exception as e:
+                records.append({'Session': session, 'Page': None, 'Interaction': 'session', 'Seconds': np.nan, 'Error': f"{type(e).__name__}: {e}"})
+                del sessions[session]
+
+# Function to summarize rerun latency per page and interaction
+def latency_percentiles(records):
+    df = pd.DataFrame(records).dropna(subset=['Seconds'])
+    grouped = df.groupby(['Page', 'Interaction'], sort=False)['Seconds']
+    summary = grouped.agg(Count='count',
+                          P50_ms=lambda s: s.quantile(0.50) * 1000,
+                          P90_ms=lambda s: s.quantile(0.90) * 1000,
+                          P95_ms=lambda s: s.quantile(0.95) * 1000,
+                          P99_ms=lambda s: s.quantile(0.99) * 1000,
+                          Max_ms=lambda s: s.max() * 1000)
+    return summary.round(1).reset_index()
+
+# Function to parse command-line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive the Streamlit pages from many concurrent simulated sessions.")
+    parser.add_argument('--sessions', type=int, default=20, help="Simulated sessions open at once")
+    parser.add_argument('--rounds', type=int, default=3, help="Times each session repeats its interactions")
+    parser.add_argument('--export', default='', help="XLSX/CSV export for Prepare Data sessions (without it, all sessions analyze)")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds allowed per rerun")
+    parser.add_argument('--full-reruns', action='store_true', help="Rerun the whole script for every interaction, even inside fragments")
+    parser.add_argument('--json', default='', help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+# Main function
+def main():
+    args = parse_args()
+    if args.export:
+        args.export = os.path.abspath(args.export)
+        os.environ['PREPARE_DATA_ALLOW_LOCAL_FILES'] = '1'
+    if not args.full_reruns and not fragment_reruns_supported():
+        print("This Streamlit version lacks the internals fragment reruns are simulated with; using full reruns")
+        args.full_reruns = True
+    if not args.full_reruns:
+        app_test.LocalScriptRunner = FragmentScriptRunner
+    rerun_mode = 'full reruns' if args.full_reruns else 'fragment reruns simulated in-process'
+    records = []
+    sampler = MemorySampler().start()
+    started = time.perf_counter()
+    run_sessions(args, records)
+    elapsed = time.perf_counter() - started
+    memory = sampler.stop()
+
+    summary = latency_percentiles(records)
+    errors = [r for r in records if r['Error']]
+    print(f"{args.sessions} sessions x {args.rounds} rounds ({rerun_mode}): {len(records)} reruns in {elapsed:.1f}s")
+    print(summary.to_string(index=False))
+    print(f"Process memory: start {memory['Start_MiB']} MiB, peak {memory['Peak_MiB']} MiB, end {memory['End_MiB']} MiB")
+    for r in errors[:10]:
+        print(f"Error in session {r['Session']} ({r['Page']}, {r['Interaction']}): {r['Error']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rerun_mode': rerun_mode, 'elapsed_seconds': elapsed, 'memory': memory, 'latency': summary.to_dict(orient='records'),
+                       'errors': errors}, f, indent=2, default=str)
+    return 0 if not errors else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""
+Column profiling for the Prepare Data page.
+
+Every column is profiled in one pass over its values: null count, distinct
+count, min/max, quartiles and a histogram (value counts of the most common
+values for text and boolean columns). Infinite values, e.g. from a division
+in a P/L column, are counted separately and left out of the range, quartiles
+and histogram. Columns are profiled in parallel on a thread pool; pandas and
+numpy release the GIL in the hashing, sorting and histogram kernels that do
+the work. Columns longer than EXACT_MAX_ROWS use sketches instead of exact
+statistics: the distinct count is a K-minimum-values estimate over the
+values' 64-bit hashes, and the quartiles come from a fixed size random
+sample. Null counts, min/max and histograms stay exact. Profiles are cached
+per dataset version, so returning to a file already profiled costs nothing.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pipeline import LRUCache
+
+# Columns longer than this are profiled with sketches
+EXACT_MAX_ROWS = 1_000_000
+# Hashes kept by the K-minimum-values distinct count sketch
+DISTINCT_SKETCH_SIZE = 4096
+# Values sampled for the quartiles of a sketched column
+QUANTILE_SAMPLE_SIZE = 100_000
+# Histogram bars per column
+HISTOGRAM_BINS = 20
+
+# Function to estimate the distinct values of a column from its smallest hashes
+# With k hashes kept, the k-th smallest of n distinct uniform 64-bit hashes sits
+# near k / n of the hash range, so n is about (k - 1) / (k-th smallest / 2**64).
+# Only the smallest hashes are deduplicated: a partition finds the smallest m, and m
+# doubles until they hold k distinct hashes.
+def approximate_distinct(values, k=DISTINCT_SKETCH_SIZE):
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    m = k
+    while m < len(hashes):
+        smallest = np.unique(np.partition(hashes, m - 1)[:m])
+        if len(smallest) >= k:
+            return int(round((k - 1) / (smallest[k - 1] / 2.0**64)))
+        m *= 2
+    return len(np.unique(hashes))
+
+# Function to take a fixed-size random sample of a column's values for its quartiles
+def quantile_sample(values, size=QUANTILE_SAMPLE_SIZE):
+    if len(values) <= size:
+        return values
+    rng = np.random.default_rng(0)
+    return values[np.sort(rng.choice(len(values), size=size, replace=False))]
+
+# Function to profile one column
+# Numbers and datetimes get min/max, quartiles and a histogram over their finite values;
+# any other column gets the counts of its most common values as its histogram.
+def profile_column(series, exact_max_rows=EXACT_MAX_ROWS):
+    approximate = len(series) > exact_max_rows
+    values = series.dropna()
+    profile = {
+        'Column': series.name,
+        'Datatype': str(series.dtype),
+        'Nulls': len(series) - len(values),
+        'Null_Percent': round(100 * (len(series) - len(values)) / len(series), 2) if len(series) else 0.0,
+        'Non_Finite': 0,
+        'Distinct': approximate_distinct(values) if approximate else int(values.nunique()),
+        'Min': None, 'P25': None, 'Median': None, 'P75': None, 'Max': None,
+        'Histogram': [],
+        'Approximate': approximate,
+    }
+    if values.empty:
+        return profile
+
+    is_datetime = pd.api.types.is_datetime64_any_dtype(series)
+    if is_datetime:
+        values = values.dt.as_unit('ns')
+    if (pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)) or is_datetime:
+        numbers = values.to_numpy(dtype='int64' if is_datetime else 'float64')
+        if not is_datetime:
+            finite = np.isfinite(numbers)
+            profile['Non_Finite'] = int(len(numbers) - finite.sum())
+            numbers = numbers[finite]
+        if len(numbers) == 0:
+            return profile
+        low, high = numbers.min(), numbers.max()
+        quartiles = np.quantile(quantile_sample(numbers) if approximate else numbers, [0.25, 0.5, 0.75])
+        if is_datetime:
+            to_value = lambda x: str(pd.Timestamp(int(x), tz=getattr(series.dtype, 'tz', None)))
+        else:
+            to_value = lambda x: f"{x:.6g}"
+        profile.update(Min=to_value(low), P25=to_value(quartiles[0]), Median=to_value(quartiles[1]),
+                       P75=to_value(quartiles[2]), Max=to_value(high))
+        counts, _ = np.histogram(numbers, bins=HISTOGRAM_BINS, range=(float(low), float(high)))
+        profile['Histogram'] = counts.tolist()
+    else:
+        profile['Histogram'] = values.value_counts(sort=True).head(HISTOGRAM_BINS).tolist()
+    return profile
+
+# Function to profile every column of a frame in parallel, one column per task
+def profile_columns(df, workers=None, exact_max_rows=EXACT_MAX_ROWS):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        profiles = list(executor.map(lambda col: profile_column(df[col], exact_max_rows), df.columns))
+    logging.info(f"Profiled {len(df.columns)} columns over {len(df)} rows in {time.perf_counter() - started:.3f}s")
+    return pd.DataFrame(profiles)
+
+# A process-wide cache of column profiles keyed by dataset version
+class ColumnProfileCache:
+    def __init__(self, max_entries=32):
+        self._profiles = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._building = {}
+
+    # Function to get the profile of a dataset version, profiling df on a miss
+    # Returned profiles are shared and must not be modified. The cache lock is only held
+    # to look up and insert, so profiling one dataset does not block the others; sessions
+    # waiting on the same dataset's build count hits.
+    def get_profile(self, df, dataset_version):
+        with self._lock:
+            if dataset_version in self._profiles:
+                return self._profiles.get(dataset_version)
+            key_lock = self._building.setdefault(dataset_version, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                profile = self._profiles.get(dataset_version)
+            if profile is not None:
+                return profile
+            try:
+                profile = profile_columns(df)
+                with self._lock:
+                    self._profiles.put(dataset_version, profile)
+            finally:
+                with self._lock:
+                    self._building.pop(dataset_version, None)
+        return profile
+
+    # Function to report cache counters for display
+    def stats(self):
+        return {'Profiles': len(self._profiles), 'Hits': self._profiles.hits, 'Misses': self._profiles.misses}
+
+# Function to get the one column profile cache shared by every session in this process
+@st.cache_resource
+def get_column_profile_cache():
+    return ColumnProfileCache()
@@ -0,0 +1,66 @@
+import streamlit as st
+import logging
+from perform_analyzer import list_saved_datasets, load_saved_dataset
+from snapshot_diff import diff_snapshots
+
+# Function to display a diff result
+def display_diff(result, key):
+    summary = result['summary']
+    cols = st.columns(4)
+    cols[0].metric("Added", summary['Added'])
+    cols[1].metric("Removed", summary['Removed'])
+    cols[2].metric("Modified", summary['Modified'])
+    cols[3].metric("Changed Cells", summary['Changed_Cells'])
+    if result['columns_added'] or result['columns_removed']:
+        st.info(f"Columns added: {result['columns_added'] or 'none'}; columns removed: {result['columns_removed'] or 'none'}")
+
+    with st.expander(f"Added rows ({summary['Added']})"):
+        st.dataframe(result['added'], use_container_width=True)
+    with st.expander(f"Removed rows ({summary['Removed']})"):
+        st.dataframe(result['removed'], use_container_width=True)
+    with st.expander(f"Modified rows ({summary['Modified']})", expanded=True):
+        changes = result['changes']
+        if len(changes):
+            st.write("Changes per column:")
+            st.dataframe(changes['Column'].value_counts().rename('Changed_Cells').reset_index(), use_container_width=True)
+            column = st.selectbox("Show changes in column", ['All'] + list(changes['Column'].unique()))
+            if column != 'All':
+                changes = changes[changes['Column'] == column]
+            # Old and new values can be of mixed types, so show them as text
+            st.dataframe(changes.astype({'Old_Value': str, 'New_Value': str}), use_container_width=True)
+        st.dataframe(result['modified'], use_container_width=True)
+
+# Main function
+def main():
+    st.title("Compare Dataset Snapshots")
+
+    # Select the two snapshots; the older one defaults to the second newest
+    saved_files = list_saved_datasets()
+    if len(saved_files) < 2:
+        st.info("At least two saved datasets are needed to compare snapshots.")
+        return
+    cols = st.columns(2)
+    old_file = cols[0].selectbox("Old snapshot", saved_files, index=1)
+    new_file = cols[1].selectbox("New snapshot", saved_files, index=0)
+
+    old, _ = load_saved_dataset(old_file)
+    new, _ = load_saved_dataset(new_file)
+    if old is None or new is None:
+        return
+    key_options = [col for col in new.columns if col in old.columns]
+    key = st.selectbox("Match rows on", key_options, index=key_options.index('Trade') if 'Trade' in key_options else 0)
+
+    # Diff the snapshots; the result is kept for reruns with the same selection
+    selection = (old_file, new_file, key)
+    if st.session_state.get('snapshot_diff_selection') != selection:
+        try:
+            st.session_state.snapshot_diff = diff_snapshots(old, new, key)
+            st.session_state.snapshot_diff_selection = selection
+        except Exception as e:
+            logging.error(f"Error comparing {old_file} with {new_file}: {str(e)}")
+            st.error(f"Error comparing {old_file} with {new_file}: {str(e)}")
+            return
+    display_diff(st.session_state.snapshot_diff, key)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Process-wide, read-only dataset cache shared by all Streamlit sessions.
+
+Saved datasets are keyed by a hash of their file contents, so every session
+viewing the same snapshot gets the same DataFrame object instead of parsing
+its own copy. Entries are evicted least-recently-used once the total in-memory
+size exceeds a byte budget. Cached frames are shared: callers must not modify
+them in place (use df.assign / df.copy() for derived columns).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import streamlit as st
+
+# Memory budget in MiB, configurable through the environment
+DEFAULT_MAX_MB = int(os.environ.get('DATASET_CACHE_MAX_MB', '1024'))
+
+# Most file hashes remembered, so a long-lived server does not keep one per file ever seen
+MAX_FILE_HASHES = 1024
+
+# Function to measure a cached value's in-memory size in bytes
+def dataset_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+# A thread-safe LRU cache of DataFrames bounded by total bytes
+class SharedDatasetCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._file_hashes = OrderedDict()
+
+    # Function to hash a file's contents, reusing the hash while mtime and size are unchanged
+    # One hash is kept per path (a changed file replaces its old entry), at most
+    # MAX_FILE_HASHES of them, and a path's hash is dropped when its dataset is evicted.
+    def dataset_hash(self, path):
+        path = Path(path)
+        stat = path.stat()
+        file_key = str(path.resolve())
+        with self._lock:
+            entry = self._file_hashes.get(file_key)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._file_hashes.move_to_end(file_key)
+                return entry[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.file_digest(f, 'sha256').hexdigest()
+        with self._lock:
+            self._file_hashes[file_key] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._file_hashes.move_to_end(file_key)
+            while len(self._file_hashes) > MAX_FILE_HASHES:
+                self._file_hashes.popitem(last=False)
+        return digest
+
+    # Function to return the cached dataset for key, calling loader() once on a miss
+    # Concurrent sessions asking for the same missing key wait for one load; only the
+    # session that loads counts a miss, the ones served its copy count hits.
+    def get_or_load(self, key, loader):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+            try:
+                df = loader()
+                nbytes = dataset_nbytes(df)
+                with self._lock:
+                    self._entries[key] = (df, nbytes)
+                    self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        logging.info(f"Cached dataset {key[:12]} ({nbytes / 2**20:.1f} MiB)")
+        return df
+
+    # Function to drop least-recently-used entries until the cache fits its budget
+    # The newest entry is kept even when it alone exceeds the budget.
+    def _evict(self):
+        while len(self._entries) > 1 and self.total_bytes() > self.max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._forget_file_hashes({key})
+            logging.info(f"Evicted dataset {key[:12]} from shared cache")
+
+    # Function to drop the file hashes of the given dataset keys
+    def _forget_file_hashes(self, keys):
+        for file_key in [k for k, entry in self._file_hashes.items() if entry[2] in keys]:
+            del self._file_hashes[file_key]
+
+    def total_bytes(self):
+        return sum(nbytes for _, nbytes in self._entries.values())
+
+    # Function to load a dataset file through the cache, keyed by its content hash
+    def load_file(self, path, reader):
+        return self.get_or_load(self.dataset_hash(path), lambda: reader(path))
+
+    # Function to report cache counters for display
+    def stats(self):
+        with self._lock:
+            return {
+                'Datasets': len(self._entries),
+                'MiB_Used': round(self.total_bytes() / 2**20, 1),
+                'MiB_Budget': round(self.max_bytes / 2**20, 1),
+                'Hits': self.hits,
+                'Misses': self.misses,
+                'Evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._file_hashes.clear()
+
+# Function to get the one cache instance shared by every session in this process
+@st.cache_resource
+def get_shared_dataset_cache():
+    return SharedDatasetCache(max_bytes=DEFAULT_MAX_MB * 2**20)
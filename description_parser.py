@@ -0,0 +1,96 @@
+"""
+Parser for trade Description values such as
+"*TRADE 071- 20Dec 2024 SPX A14-PT" or "TRADE 004 - 1 Sep 2023 SPX A14".
+
+Extracts the trade number, expiry date, underlying, strategy and the
+"*" (starred) and "-PT" (profit target) flags into typed columns. Descriptions
+repeat heavily, so each distinct value is parsed once: the column is factorized,
+only distinct values missing from the parse cache go through one compiled,
+vectorized str.extract call, and the results are broadcast back by code.
+"""
+
+import logging
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from pipeline import LRUCache
+
+DESCRIPTION_PATTERN = re.compile(
+    r'^\s*(?P<Starred>\*)?\s*TRADE\s+(?P<Trade_Number>\d+)\s*-\s*'
+    r'(?P<Expiry_Day>\d{1,2})\s*(?P<Expiry_Month>[A-Za-z]{3})[A-Za-z]*\s+(?P<Expiry_Year>\d{4})\s+'
+    r'(?P<Underlying>\S+)\s+(?P<Strategy>\S+?)(?P<Profit_Target>-PT)?\s*$',
+    re.IGNORECASE,
+)
+
+# Typed columns added to the dataset, in order
+DESCRIPTION_COLUMNS = ['Trade_Number', 'Expiry', 'Underlying', 'Strategy', 'Starred', 'Profit_Target']
+
+# Parsed fields per distinct description, shared across files and reruns
+# A value of None marks a description that did not match the pattern. The cache is
+# shared by every session and the watch-folder worker, so it is only used under the lock.
+DESCRIPTION_CACHE = LRUCache(max_entries=100_000)
+DESCRIPTION_CACHE_LOCK = threading.Lock()
+
+# Marks a description missing from the cache, since None is a cached "unmatched"
+_MISSING = object()
+
+# Function to parse distinct descriptions into a frame of typed fields
+def parse_unique_descriptions(descriptions):
+    extracted = pd.Series(descriptions, dtype=object).str.extract(DESCRIPTION_PATTERN)
+    expiry_text = extracted['Expiry_Day'] + extracted['Expiry_Month'].str.title() + extracted['Expiry_Year']
+    return pd.DataFrame({
+        'Trade_Number': pd.to_numeric(extracted['Trade_Number'], errors='coerce').astype('Int64'),
+        'Expiry': pd.to_datetime(expiry_text, format='%d%b%Y', errors='coerce'),
+        'Underlying': extracted['Underlying'].str.upper(),
+        'Strategy': extracted['Strategy'],
+        'Starred': extracted['Starred'].notna(),
+        'Profit_Target': extracted['Profit_Target'].notna(),
+        'Matched': extracted['Trade_Number'].notna(),
+    })
+
+# Function to parse a Description column into typed columns
+# Returns (parsed, unmatched): parsed has DESCRIPTION_COLUMNS aligned to the input
+# rows, unmatched is a boolean Series marking non-empty descriptions that did not parse.
+def parse_descriptions(series, cache=DESCRIPTION_CACHE):
+    codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+    uniques = [str(value) for value in uniques]
+
+    # Look up each distinct description once; parse only the cache misses
+    with DESCRIPTION_CACHE_LOCK:
+        table = [cache.get(value, _MISSING) for value in uniques]
+    misses = [i for i, fields in enumerate(table) if fields is _MISSING]
+    if misses:
+        parsed = parse_unique_descriptions([uniques[i] for i in misses])
+        for i, row in zip(misses, parsed.itertuples(index=False)):
+            table[i] = tuple(row[:-1]) if row.Matched else None
+        with DESCRIPTION_CACHE_LOCK:
+            for i in misses:
+                cache.put(uniques[i], table[i])
+
+    # One row per distinct description plus a trailing empty row for missing values
+    empty = (pd.NA, pd.NaT, None, None, False, False)
+    unique_frame = pd.DataFrame([fields if fields is not None else empty for fields in table] + [empty],
+                                columns=DESCRIPTION_COLUMNS)
+    unique_frame = unique_frame.astype({'Trade_Number': 'Int64', 'Expiry': 'datetime64[ns]', 'Underlying': 'string',
+                                        'Strategy': 'string', 'Starred': bool, 'Profit_Target': bool})
+    matched = np.array([fields is not None for fields in table] + [True])
+    positions = np.where(codes < 0, len(table), codes)
+
+    parsed = unique_frame.take(positions)
+    parsed.index = series.index
+    unmatched = pd.Series(~matched[positions], index=series.index)
+    logging.info(f"Parsed {len(series)} descriptions ({len(uniques)} distinct, {len(misses)} newly parsed, {int(unmatched.sum())} unmatched)")
+    return parsed, unmatched
+
+# Function to add the parsed Description columns to a dataset
+# Returns (df, unmatched); df is returned unchanged when it has no Description column.
+def add_description_columns(df, enabled=True):
+    if not enabled or 'Description' not in df.columns:
+        return df, pd.Series(False, index=df.index)
+    parsed, unmatched = parse_descriptions(df['Description'])
+    df = df.drop(columns=[col for col in DESCRIPTION_COLUMNS if col in df.columns])
+    df = df.assign(**{col: parsed[col].array for col in DESCRIPTION_COLUMNS})
+    return df, unmatched
@@ -0,0 +1,88 @@
+"""
+Calendar-period equity curves for the analyzer charts.
+
+Profit_Loss is aggregated per day on the chosen date column (Opened or
+Closed) in one pass over the raw trades; the weekly and monthly series are
+then resampled from the daily series, not from the trades. All granularities
+for a dataset version and date column are built together and cached, so
+switching the chart between them is a dictionary lookup.
+"""
+
+import logging
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from pipeline import LRUCache
+
+# Chart granularities and the pandas resample rule for each (None = daily base series)
+# Weeks end on Friday, the last trading day, and months are labelled by their last day.
+GRANULARITIES = {'Daily': None, 'Weekly': 'W-FRI', 'Monthly': 'ME'}
+
+# Function to aggregate trade Profit_Loss per calendar day of a date column
+def daily_profit_loss(df, date_column):
+    dates = pd.to_datetime(df[date_column], errors='coerce').dt.normalize()
+    profit_loss = pd.to_numeric(df['Profit_Loss'], errors='coerce')
+    valid = dates.notna()
+    daily = profit_loss[valid].groupby(dates[valid].to_numpy()).agg(['sum', 'count'])
+    daily.columns = ['Profit_Loss', 'Trades']
+    daily.index.name = 'Date'
+    return daily
+
+# Function to build the equity curve for every granularity from the raw trades
+# Returns {granularity: DataFrame[Date, Profit_Loss, Trades, Cumulative_Profit_Loss]}.
+def build_equity_curves(df, date_column):
+    started = time.perf_counter()
+    daily = daily_profit_loss(df, date_column)
+    curves = {}
+    for granularity, rule in GRANULARITIES.items():
+        series = daily if rule is None else daily.resample(rule).sum()
+        series = series.assign(Cumulative_Profit_Loss=series['Profit_Loss'].cumsum())
+        curves[granularity] = series.reset_index()
+    logging.info(f"Built {date_column} equity curves from {len(df)} trades ({len(daily)} days) in {time.perf_counter() - started:.3f}s")
+    return curves
+
+# A process-wide cache of equity curves keyed by (dataset version, date column)
+class EquityCurveCache:
+    def __init__(self, max_entries=32):
+        self._curves = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._building = {}
+
+    # Function to return the cached curves for a dataset version, building them on a miss
+    # The cache lock is only held to look up and insert; sessions missing the same key
+    # wait on that key's build lock for one build and count hits, and other keys are not blocked.
+    def get_curves(self, df, dataset_version, date_column):
+        key = (dataset_version, date_column)
+        with self._lock:
+            if key in self._curves:
+                return self._curves.get(key)
+            key_lock = self._building.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                curves = self._curves.get(key)
+            if curves is not None:
+                return curves
+            try:
+                curves = build_equity_curves(df, date_column)
+                with self._lock:
+                    self._curves.put(key, curves)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        return curves
+
+# Function to get the one equity curve cache shared by every session in this process
+@st.cache_resource
+def get_equity_curve_cache():
+    return EquityCurveCache()
+
+# Function to filter an equity curve to a date range; curves are sorted by Date
+def filter_curve(curve, start_date, end_date):
+    dates = curve['Date']
+    lo = dates.searchsorted(pd.Timestamp(start_date), side='left')
+    hi = dates.searchsorted(pd.Timestamp(end_date) + pd.Timedelta(days=1), side='left')
+    return curve.iloc[lo:hi]
@@ -0,0 +1,64 @@
+"""
+Download bundle for a cleaned dataset.
+
+Builds a single zip holding the cleaned dataset as Parquet (columnar) and
+CSV, its schema (datatype map, sort keys, resulting dtypes) and the run's
+logfile. Every member is streamed straight into the zip: the CSV and Parquet
+encodings are written in row chunks through the zip member's file handle, so
+no intermediate CSV string, Parquet buffer or temp file is ever built.
+"""
+
+import io
+import json
+import logging
+import zipfile
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows encoded per chunk when streaming CSV and Parquet members
+CHUNK_ROWS = 50_000
+
+# Function to stream a DataFrame as CSV into an open zip member
+def write_csv_member(zf, name, df, chunk_rows=CHUNK_ROWS):
+    with zf.open(name, 'w', force_zip64=True) as member, io.TextIOWrapper(member, encoding='utf-8', newline='') as text:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(text, index=False, header=(start == 0))
+
+# Function to stream a DataFrame as Parquet row groups into an open zip member
+def write_parquet_member(zf, name, df, chunk_rows=CHUNK_ROWS):
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with zf.open(name, 'w', force_zip64=True) as member, pq.ParquetWriter(member, schema) as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+
+# Function to describe a dataset's schema for the bundle
+def dataset_schema(df, datatype_map, sort_keys):
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'rows': len(df),
+        'columns': [{'name': col, 'dtype': str(dtype)} for col, dtype in df.dtypes.items()],
+        'datatype_map': datatype_map,
+        'sort_keys': [{'column': col, 'ascending': bool(asc)} for col, asc in sort_keys],
+    }
+
+# Function to build the zip bundle; returns a BytesIO positioned at the start
+# The compressed zip is the only copy of the encoded data held in memory.
+def build_export_bundle(df, datatype_map, sort_keys=(), log_file=None, base_name="trade_performance_dataset_cleaned"):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        # Parquet is already compressed, so store it without deflating it again
+        parquet_info = zipfile.ZipInfo(f"{base_name}.parquet", date_time=datetime.now().timetuple()[:6])
+        parquet_info.compress_type = zipfile.ZIP_STORED
+        write_parquet_member(zf, parquet_info, df)
+        write_csv_member(zf, f"{base_name}.csv", df)
+        zf.writestr(f"{base_name}.schema.json", json.dumps(dataset_schema(df, datatype_map, sort_keys), indent=2))
+        if log_file:
+            try:
+                zf.write(log_file, arcname=f"{base_name}.log")
+            except OSError as e:
+                logging.error(f"Error adding logfile {log_file} to export bundle: {str(e)}")
+    logging.info(f"Built export bundle {base_name}.zip ({buffer.tell()} bytes)")
+    buffer.seek(0)
+    return buffer
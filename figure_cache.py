@@ -0,0 +1,102 @@
+"""
+Cache of Plotly line figures for the analyzer charts.
+
+Finished figures are kept per (dataset version, series, date range,
+granularity), so a rerun that changes nothing about a chart reuses its
+figure. On a miss the figure is not rebuilt through plotly express: an empty
+template figure (layout, axis titles, trace styling) is built once per chart
+title and copied, and only the trace's x and y data are filled in.
+"""
+
+import threading
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from pipeline import LRUCache
+
+# Most points sent to the browser for an overview chart
+OVERVIEW_MAX_POINTS = 2_000
+
+# Function to downsample a frame for plotting, keeping each bucket's lowest and highest y
+# Rows are split into max_points // 2 equal buckets; one stable sort by (bucket, y)
+# finds every bucket's min and max row at once, so peaks and troughs survive.
+def downsample_minmax(frame, y, max_points=OVERVIEW_MAX_POINTS):
+    n = len(frame)
+    if n <= max_points:
+        return frame
+    edges = np.linspace(0, n, max_points // 2 + 1).astype(int)
+    buckets = np.repeat(np.arange(len(edges) - 1), np.diff(edges))
+    order = np.lexsort((frame[y].to_numpy(dtype=float), buckets))
+    keep = np.concatenate([order[edges[:-1]], order[edges[1:] - 1], [0, n - 1]])
+    return frame.iloc[np.unique(keep)]
+
+# A process-wide cache of line figures and their templates
+class FigureCache:
+    def __init__(self, max_figures=64):
+        self._figures = LRUCache(max_entries=max_figures)
+        self._templates = LRUCache(max_entries=max_figures)
+        self._lock = threading.Lock()
+
+    # Function to build the empty line figure a chart's figures are copied from
+    # An overview template adds a range slider and preset range buttons, all handled in the browser.
+    # On a downsampled (selectable) overview, dragging box-selects the date range to chart in
+    # full detail; plotly.js only offers the Box Select tool for traces with markers, so the
+    # line also gets 1px markers, letting the user switch back to selecting after zooming.
+    def _template(self, frame, x, y, title, x_title, y_title, overview=False, selectable=False):
+        key = (x, y, title, x_title, y_title, overview, selectable)
+        template = self._templates.get(key)
+        if template is None:
+            template = px.line(frame.iloc[:0], x=x, y=y, title=title)
+            template.update_xaxes(title=x_title)
+            template.update_yaxes(title=y_title)
+            if overview:
+                template.update_xaxes(rangeslider_visible=True, rangeselector=dict(buttons=[
+                    dict(count=1, label='1m', step='month', stepmode='backward'),
+                    dict(count=6, label='6m', step='month', stepmode='backward'),
+                    dict(count=1, label='YTD', step='year', stepmode='todate'),
+                    dict(count=1, label='1y', step='year', stepmode='backward'),
+                    dict(step='all'),
+                ]))
+                template.update_layout(dragmode='zoom')
+            if selectable:
+                template.update_traces(mode='lines+markers', marker_size=1)
+                template.update_layout(dragmode='select', selectdirection='h')
+            self._templates.put(key, template)
+        return template
+
+    # Function to get the line figure for key, building it from load_frame() on a miss
+    # key is (dataset version, series, date range, granularity); load_frame is only
+    # called on a miss, so filtering for a cached range is skipped as well.
+    # Returned figures are shared and must not be modified.
+    def line_figure(self, key, load_frame, x, y, title, x_title='Date', y_title=None, overview=False):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                return fig
+        frame = load_frame()
+        selectable = overview and len(frame) > OVERVIEW_MAX_POINTS
+        if overview:
+            frame = downsample_minmax(frame, y)
+        with self._lock:
+            fig = go.Figure(self._template(frame, x, y, title, x_title, y_title or y, overview, selectable))
+            fig.data[0].update(x=frame[x].to_numpy(), y=frame[y].to_numpy())
+            self._figures.put(key, fig)
+        return fig
+
+    # Function to get an overview figure: the whole series downsampled to at most
+    # OVERVIEW_MAX_POINTS points, sent once and zoomed with a range slider in the browser;
+    # dragging on a downsampled overview selects a range to chart in full detail
+    def overview_figure(self, key, load_frame, x, y, title, x_title='Date', y_title=None):
+        return self.line_figure(key, load_frame, x, y, title, x_title, y_title, overview=True)
+
+    # Function to report cache counters for display
+    def stats(self):
+        return {'Figures': len(self._figures), 'Hits': self._figures.hits, 'Misses': self._figures.misses}
+
+# Function to get the one figure cache shared by every session in this process
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
@@ -0,0 +1,130 @@
+"""
+Bootstrap Monte Carlo simulation of trade equity paths.
+
+Historical per-trade outcomes are resampled with replacement into simulated
+equity paths, generated a batch at a time as 2-D NumPy arrays (paths x
+trades) with no per-path Python loop. Large runs are split into batches that
+run on a process pool; every batch draws from its own child of one
+SeedSequence, so a given seed gives the same paths whatever the number of
+workers or the order batches finish in.
+
+Two sampling modes are supported:
+
+    'Profit_Loss'         - each trade adds a resampled dollar P/L to equity
+    'Yield_on_Max_Margin' - each trade commits margin_fraction of current
+                            equity as margin and earns a resampled yield on it
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Sampling modes and the column each one resamples
+SIMULATION_MODES = ['Profit_Loss', 'Yield_on_Max_Margin']
+
+# Percentiles drawn as bands around the median path
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Trade steps kept per path for the percentile bands
+BAND_POINTS = 200
+
+# Paths per batch, and the size (paths x trades) below which a run stays in-process
+BATCH_PATHS = 2_000
+POOL_MIN_CELLS = 20_000_000
+
+# Function to simulate one batch of equity paths
+# Returns an array of shape (n_paths, n_trades + 1) starting at starting_capital.
+def simulate_batch(outcomes, n_paths, n_trades, seed, mode='Profit_Loss', starting_capital=100_000.0, margin_fraction=0.1):
+    rng = np.random.default_rng(seed)
+    samples = rng.choice(np.asarray(outcomes, dtype=np.float64), size=(n_paths, n_trades), replace=True)
+    equity = np.empty((n_paths, n_trades + 1))
+    equity[:, 0] = starting_capital
+    if mode == 'Profit_Loss':
+        np.cumsum(samples, axis=1, out=equity[:, 1:])
+        equity[:, 1:] += starting_capital
+    else:
+        # Equity cannot fall below zero: a return below -100% wipes the account out
+        growth = np.maximum(1.0 + margin_fraction * samples, 0.0)
+        np.cumprod(growth, axis=1, out=equity[:, 1:])
+        equity[:, 1:] *= starting_capital
+    return equity
+
+# Function to measure each path's maximum drawdown as a fraction of its running peak
+def max_drawdowns(equity):
+    peaks = np.maximum.accumulate(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.where(peaks > 0, (peaks - equity) / peaks, 0.0)
+    return drawdowns.max(axis=1)
+
+# Function to pick the trade steps at which bands are drawn (at most points of them)
+def band_steps(n_trades, points=BAND_POINTS):
+    return np.unique(np.linspace(0, n_trades, min(points, n_trades + 1)).round().astype(int))
+
+# Function to simulate one batch and reduce it to what the chart and statistics need
+# Only the band steps of each path are returned (as float32), so a batch sent back
+# from a worker is a small fraction of its full paths x trades equity array.
+def simulate_batch_results(outcomes, n_paths, n_trades, seed, mode='Profit_Loss', starting_capital=100_000.0,
+                           margin_fraction=0.1, ruin_loss=0.5):
+    equity = simulate_batch(outcomes, n_paths, n_trades, seed, mode, starting_capital, margin_fraction)
+    return {
+        'band_equity': equity[:, band_steps(n_trades)].astype(np.float32),
+        'final': equity[:, -1],
+        'max_drawdown': max_drawdowns(equity),
+        'ruined': equity.min(axis=1) <= starting_capital * (1 - ruin_loss),
+    }
+
+# Function to concatenate batch results, in batch order
+def combine_batches(batches):
+    order = sorted(batches)
+    return {name: np.concatenate([batches[i][name] for i in order]) for name in batches[order[0]]}
+
+# Function to compute percentile bands per band step over a set of paths
+# Returns {percentile: array of equity values, one per band step}.
+def percentile_bands(band_equity, percentiles=BAND_PERCENTILES):
+    values = np.percentile(band_equity, percentiles, axis=0)
+    return dict(zip(percentiles, values))
+
+# Function to summarize simulated paths into sizing statistics
+def summarize_paths(results, starting_capital):
+    final = results['final']
+    drawdowns = results['max_drawdown']
+    return {
+        'Paths': int(len(final)),
+        'Median_Final_Equity': float(np.median(final)),
+        'Mean_Final_Equity': float(final.mean()),
+        'P5_Final_Equity': float(np.percentile(final, 5)),
+        'P95_Final_Equity': float(np.percentile(final, 95)),
+        'Probability_of_Loss': float((final < starting_capital).mean()),
+        'Median_Max_Drawdown': float(np.median(drawdowns)),
+        'P95_Max_Drawdown': float(np.percentile(drawdowns, 95)),
+        'Probability_of_Ruin': float(results['ruined'].mean()),
+    }
+
+# Function to split a run into batch sizes of at most batch_paths paths
+def batch_sizes(n_paths, batch_paths=BATCH_PATHS):
+    return [min(batch_paths, n_paths - start) for start in range(0, n_paths, batch_paths)]
+
+# Function to run a simulation batch by batch, yielding (batch_index, results) as batches finish
+# Small runs are simulated in-process; larger ones are spread over a process pool
+# started with 'spawn', so workers never inherit the Streamlit server's threads.
+def run_simulation(outcomes, n_paths, n_trades, seed, mode='Profit_Loss', starting_capital=100_000.0,
+                   margin_fraction=0.1, ruin_loss=0.5, workers=None, batch_paths=BATCH_PATHS):
+    sizes = batch_sizes(n_paths, batch_paths)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    args = [(outcomes, size, n_trades, child, mode, starting_capital, margin_fraction, ruin_loss) for size, child in zip(sizes, seeds)]
+    logging.info(f"Simulating {n_paths} paths of {n_trades} trades ({mode}, seed {seed}) in {len(sizes)} batches")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sizes) == 1 or n_paths * n_trades < POOL_MIN_CELLS:
+        for i, batch_args in enumerate(args):
+            yield i, simulate_batch_results(*batch_args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(simulate_batch_results, *batch_args): i for i, batch_args in enumerate(args)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
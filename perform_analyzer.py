@@ -5,80 +5,231 @@ import plotly.express as px
 import logging
 from pathlib import Path
 from datetime import datetime
+from arrow_sanitizer import sanitize_for_arrow
+from dataset_cache import get_shared_dataset_cache
+from equity_curves import GRANULARITIES, filter_curve, get_equity_curve_cache
+from figure_cache import OVERVIEW_MAX_POINTS, get_figure_cache
+from rolling_analytics import get_rolling_analytics_cache
+from prepare_data import SNAPSHOT_STORE, is_sorted_by, load_dataset_metadata
+from snapshot_store import is_manifest
+
+# Folder the Prepare Data page and the batch CLI save cleaned datasets to
+CLEANED_DATASETS_DIR = Path("Cleaned_Datasets")
 
 # Set up logging
 log_file = Path(f"trade_data_analysis_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
 logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Function to load saved dataset
-def load_saved_dataset():
-    saved_files = [f for f in os.listdir() if f.startswith('trade_performance_dataset_cleaned_') and f.endswith('.xlsx')]
-    if saved_files:
-        selected_file = st.selectbox("Select a saved dataset", saved_files)
-        try:
-            df = pd.read_excel(selected_file)
-            logging.info(f"Loaded saved dataset from {selected_file}")
-            st.success(f"Loaded saved dataset from {selected_file}")
-            return df
-        except Exception as e:
-            logging.error(f"Error loading dataset from {selected_file}: {str(e)}")
-            st.error(f"Error loading dataset from {selected_file}: {str(e)}")
-    else:
+# Function to list saved datasets (XLSX files and snapshot manifests), newest first
+# Entries are paths relative to CLEANED_DATASETS_DIR, ordered by modification time
+# (a manifest is written once, when its snapshot is saved). Names are no guide: batch
+# and watch-folder outputs put the source file's stem before the timestamp.
+def list_saved_datasets():
+    if not CLEANED_DATASETS_DIR.exists():
+        return []
+    saved_files = [f for f in os.listdir(CLEANED_DATASETS_DIR) if f.startswith('trade_performance_dataset_cleaned_') and f.endswith('.xlsx')]
+    if SNAPSHOT_STORE.root.exists():
+        saved_files += [f"{SNAPSHOT_STORE.root.name}/{f}" for f in os.listdir(SNAPSHOT_STORE.root) if is_manifest(f)]
+    return sorted(saved_files, key=lambda f: ((CLEANED_DATASETS_DIR / f).stat().st_mtime_ns, Path(f).name), reverse=True)
+
+# Function to select a saved dataset file
+def select_saved_dataset():
+    saved_files = list_saved_datasets()
+    if not saved_files:
         st.info("No saved datasets found.")
         return None
+    return st.selectbox("Select a saved dataset", saved_files)
+
+# Function to read a saved dataset file, coercing any mixed-type columns for Arrow
+def read_saved_dataset(path):
+    df = SNAPSHOT_STORE.load_manifest(path) if is_manifest(path) else pd.read_excel(path)
+    df, _ = sanitize_for_arrow(df)
+    return df
+
+# Function to load saved dataset
+# Datasets come from the process-wide shared cache, so sessions viewing the same
+# file share one parsed copy. The returned frame must not be modified in place.
+def load_saved_dataset(selected_file):
+    try:
+        df = get_shared_dataset_cache().load_file(CLEANED_DATASETS_DIR / selected_file, read_saved_dataset)
+        metadata = load_dataset_metadata(CLEANED_DATASETS_DIR / selected_file)
+        logging.info(f"Loaded saved dataset from {selected_file}")
+        st.success(f"Loaded saved dataset from {selected_file}")
+        return df, metadata
+    except Exception as e:
+        logging.error(f"Error loading dataset from {selected_file}: {str(e)}")
+        st.error(f"Error loading dataset from {selected_file}: {str(e)}")
+        return None, {}
+
+# Function to show the shared dataset and figure cache counters
+def display_cache_stats():
+    with st.sidebar.expander("Shared Dataset Cache"):
+        for name, value in get_shared_dataset_cache().stats().items():
+            st.write(f"{name}: {value}")
+    with st.sidebar.expander("Figure Cache"):
+        for name, value in get_figure_cache().stats().items():
+            st.write(f"{name}: {value}")
+
+# Function to filter rows to a date range
+# When the saved metadata says the rows are sorted by the date column, the range is
+# found by binary search instead of scanning every row.
+def filter_date_range(df, column, start_date, end_date, metadata):
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    if is_sorted_by(metadata, column) and pd.api.types.is_datetime64_any_dtype(df[column]):
+        # NaT values are sorted last, so the valid dates are a sorted prefix
+        n_valid = int(df[column].notna().sum())
+        values = df[column].to_numpy()[:n_valid]
+        lo = values.searchsorted(start.to_datetime64(), side='left')
+        hi = values.searchsorted(end.to_datetime64(), side='left')
+        return df.iloc[lo:hi]
+    dates = pd.to_datetime(df[column])
+    return df[(dates >= start) & (dates < end)]
+
+# Function to chart rolling win rate, average yield, P/L volatility and drawdown
+def display_rolling_analytics(df, dataset_version, date_column, window, unit):
+    try:
+        metrics = get_rolling_analytics_cache().get_metrics(df, dataset_version, date_column, window, unit)
+        long_metrics = metrics.melt(id_vars='Date', var_name='Metric', value_name='Value')
+        fig = px.line(long_metrics, x='Date', y='Value', facet_row='Metric', height=800,
+                      title=f'Rolling {window}-{unit[:-1].capitalize()} Metrics by {date_column} Date')
+        fig.update_yaxes(matches=None, title='')
+        fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+        st.plotly_chart(fig, use_container_width=True)
+    except Exception as e:
+        logging.error(f"Error computing rolling {window}-{unit} metrics: {str(e)}")
+        st.error(f"Error computing rolling {window}-{unit} metrics: {str(e)}")
+
+# Function to chart the cumulative P/L for a date range chosen with date inputs
+def display_date_range_chart(df, curve, x_column, date_column, dataset_version, series, granularity, metadata):
+    # Allow user to select date range for chart
+    st.subheader("Select date range for chart:")
+    try:
+        start_date = st.date_input("Start date", value=df[date_column].min())
+        end_date = st.date_input("End date", value=df[date_column].max())
+    except Exception as e:
+        st.error(f"Error selecting date range: {str(e)}")
+        return
+
+    # Filter data and create new plot
+    try:
+        st.subheader("Filtered Cumulative Profit/Loss Chart:")
+        display_range_detail(curve, x_column, date_column, dataset_version, series, granularity, metadata, start_date, end_date)
+    except Exception as e:
+        st.error(f"Error filtering data or creating filtered plot: {str(e)}")
+
+# Function to chart the full-resolution cumulative P/L between two dates
+def display_range_detail(curve, x_column, date_column, dataset_version, series, granularity, metadata, start_date, end_date):
+    if granularity == 'Trade':
+        load_filtered = lambda: filter_date_range(curve, date_column, start_date, end_date, metadata)
+    else:
+        load_filtered = lambda: filter_curve(curve, start_date, end_date)
+    fig = get_figure_cache().line_figure((dataset_version, series, (str(start_date), str(end_date)), granularity), load_filtered,
+                                         x_column, 'Cumulative_Profit_Loss', title=f'Filtered Cumulative Profit/Loss Over Time ({granularity})',
+                                         y_title='Cumulative Profit/Loss')
+    st.plotly_chart(fig, use_container_width=True)
+
+# Function to chart the whole (downsampled) cumulative P/L once, with zoom handled in the browser
+# Range slider and zoom changes never rerun the script; only a box selection does,
+# and only when the overview is downsampled, to chart the selected range in full detail.
+# A downsampled overview starts in select mode, so dragging across it selects a range.
+def display_zoomable_chart(curve, x_column, date_column, dataset_version, series, granularity, metadata):
+    try:
+        fig = get_figure_cache().overview_figure((dataset_version, series, 'overview', granularity), lambda: curve, x_column, 'Cumulative_Profit_Loss',
+                                                 title=f'Cumulative Profit/Loss Over Time ({granularity})', y_title='Cumulative Profit/Loss')
+    except Exception as e:
+        st.error(f"Error creating plot: {str(e)}")
+        return
+    if len(curve) <= OVERVIEW_MAX_POINTS:
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    st.caption(f"Showing {OVERVIEW_MAX_POINTS:,} of {len(curve):,} points. Drag across a date range to see it in full detail; zoom with the range slider or the Zoom tool.")
+    event = st.plotly_chart(fig, use_container_width=True, on_select='rerun', selection_mode='box', key=f"overview_{series}_{granularity}")
+    boxes = event.selection.get('box', []) if event else []
+    if not boxes:
+        return
+    try:
+        start_date, end_date = sorted(pd.Timestamp(x).date() for x in boxes[-1]['x'])
+        st.subheader(f"Detail from {start_date} to {end_date}:")
+        display_range_detail(curve, x_column, date_column, dataset_version, series, granularity, metadata, start_date, end_date)
+    except Exception as e:
+        st.error(f"Error creating detail plot: {str(e)}")
 
 # Main function
 def main():
     st.title("Analyze Trade Performance")
 
-    # Load saved dataset
+    # Select and load a saved dataset; the choice is kept across reruns
+    selected_file = select_saved_dataset()
+    display_cache_stats()
+    if selected_file is None:
+        return
     if st.button("Load Saved Dataset"):
-        df = load_saved_dataset()
-        if df is not None:
-            st.subheader("Trade data:")
-            st.dataframe(df)
-
-            # Analyze trades
-            if st.button("Analyze Trades"):
-                try:
-                    df['Cumulative_Profit_Loss'] = df['Profit_Loss'].cumsum()
-                except Exception as e:
-                    st.error(f"Error calculating Cumulative Profit/Loss: {str(e)}")
-                    return
-
-                # Display data
-                st.subheader("Trade data:")
-                st.dataframe(df)
-
-                # Create and display plot
-                st.subheader("Cumulative Profit/Loss Chart:")
-                try:
-                    fig = px.line(df, x='Opened', y='Cumulative_Profit_Loss', title='Cumulative Profit/Loss Over Time')
-                    fig.update_xaxes(title='Date')
-                    fig.update_yaxes(title='Cumulative Profit/Loss')
-                    st.plotly_chart(fig, use_container_width=True)
-                except Exception as e:
-                    st.error(f"Error creating plot: {str(e)}")
-
-                # Allow user to select date range for chart
-                st.subheader("Select date range for chart:")
-                try:
-                    start_date = st.date_input("Start date", value=df['Opened'].min())
-                    end_date = st.date_input("End date", value=df['Opened'].max())
-                except Exception as e:
-                    st.error(f"Error selecting date range: {str(e)}")
-                    return
-
-                # Filter data and create new plot
-                try:
-                    filtered_df = df[(df['Opened'] >= start_date) & (df['Opened'] <= end_date)]
-                    fig = px.line(filtered_df, x='Opened', y='Cumulative_Profit_Loss', title='Filtered Cumulative Profit/Loss Over Time')
-                    fig.update_xaxes(title='Date')
-                    fig.update_yaxes(title='Cumulative Profit/Loss')
-                    st.subheader("Filtered Cumulative Profit/Loss Chart:")
-                    st.plotly_chart(fig, use_container_width=True)
-                except Exception as e:
-                    st.error(f"Error filtering data or creating filtered plot: {str(e)}")
+        st.session_state.analyzer_file = selected_file
+        st.session_state.analyze_trades = False
+    if st.session_state.get('analyzer_file') is None:
+        return
+
+    df, metadata = load_saved_dataset(st.session_state.analyzer_file)
+    if df is None:
+        return
+    st.subheader("Trade data:")
+    st.dataframe(df)
+
+    # Analyze trades
+    if st.button("Analyze Trades"):
+        st.session_state.analyze_trades = True
+    if not st.session_state.get('analyze_trades'):
+        return
+
+    try:
+        df = df.assign(Cumulative_Profit_Loss=df['Profit_Loss'].cumsum())
+    except Exception as e:
+        st.error(f"Error calculating Cumulative Profit/Loss: {str(e)}")
+        return
+
+    # Display data
+    st.subheader("Trade data:")
+    st.dataframe(df)
+
+    # Choose the date column and granularity for the equity curve
+    date_columns = [col for col in ['Opened', 'Closed'] if col in df.columns]
+    date_column = st.radio("Aggregate Profit/Loss by", date_columns, horizontal=True)
+    granularity = st.radio("Granularity", ['Trade'] + list(GRANULARITIES), horizontal=True)
+    dataset_version = get_shared_dataset_cache().dataset_hash(CLEANED_DATASETS_DIR / st.session_state.analyzer_file)
+    if granularity == 'Trade':
+        curve, x_column = df, date_column
+    else:
+        try:
+            curve = get_equity_curve_cache().get_curves(df, dataset_version, date_column)[granularity]
+            x_column = 'Date'
+        except Exception as e:
+            logging.error(f"Error building {granularity} equity curve: {str(e)}")
+            st.error(f"Error building {granularity} equity curve: {str(e)}")
+            return
+
+    # Create and display plot; in zoom mode the date range is chosen in the browser
+    st.subheader("Cumulative Profit/Loss Chart:")
+    series = f"Cumulative_Profit_Loss by {date_column}"
+    if st.toggle("Zoom in the browser (range slider, drag to select a range for detail)", value=True):
+        display_zoomable_chart(curve, x_column, date_column, dataset_version, series, granularity, metadata)
+    else:
+        try:
+            fig = get_figure_cache().line_figure((dataset_version, series, None, granularity), lambda: curve, x_column, 'Cumulative_Profit_Loss',
+                                                 title=f'Cumulative Profit/Loss Over Time ({granularity})', y_title='Cumulative Profit/Loss')
+            st.plotly_chart(fig, use_container_width=True)
+        except Exception as e:
+            st.error(f"Error creating plot: {str(e)}")
+        display_date_range_chart(df, curve, x_column, date_column, dataset_version, series, granularity, metadata)
+
+    # Rolling-window analytics over the last N trades and the last N days
+    st.subheader("Rolling Analytics:")
+    cols = st.columns(2)
+    trade_window = cols[0].slider("Rolling window (trades)", min_value=2, max_value=max(len(df), 2), value=min(20, max(len(df), 2)))
+    day_window = cols[1].slider("Rolling window (days)", min_value=1, max_value=365, value=30)
+    display_rolling_analytics(df, dataset_version, date_column, trade_window, 'trades')
+    display_rolling_analytics(df, dataset_version, date_column, day_window, 'days')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
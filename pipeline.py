@@ -0,0 +1,124 @@
+"""
+Stage-level memoized pipeline used by the Prepare Data page.
+
+A pipeline is a set of named stages. Each stage declares the upstream stages
+it consumes and the run parameters it depends on. A stage's cache key is the
+fingerprint of its own parameters combined with the keys of its inputs, so
+changing a downstream parameter (e.g. the datatype map) never recomputes
+upstream stages (e.g. reading the file or cleaning the column names).
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+# Function to fingerprint a run parameter for use in a stage cache key
+def fingerprint_value(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha1(value).hexdigest()
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+# A bounded least-recently-used mapping with hit/miss counters
+class LRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+# A named step of the pipeline: func(*input_values, **param_values)
+# As with st.cache_data, params whose names start with an underscore are passed
+# to func but left out of the cache key (e.g. raw file bytes identified by a token).
+# With pass_input_keys=True the func also receives input_keys, the cache keys
+# of its upstream stages, which identify the input contents without hashing them.
+class Stage:
+    def __init__(self, name, func, inputs=(), params=(), pass_input_keys=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.pass_input_keys = pass_input_keys
+
+# A set of stages whose outputs are cached by the fingerprint of their inputs
+class Pipeline:
+    def __init__(self, stages, max_entries_per_stage=4):
+        self.stages = OrderedDict((stage.name, stage) for stage in stages)
+        self.max_entries_per_stage = max_entries_per_stage
+        self._cache = {name: LRUCache(max_entries_per_stage) for name in self.stages}
+        self._last_seconds = {name: None for name in self.stages}
+        for stage in stages:
+            for upstream in stage.inputs:
+                if upstream not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {upstream}")
+
+    # Function to compute a stage's cache key without computing any values
+    def key(self, name, params):
+        stage = self.stages[name]
+        parts = [name]
+        parts += [self.key(upstream, params) for upstream in stage.inputs]
+        parts += [f"{p}={fingerprint_value(params[p])}" for p in stage.params if not p.startswith('_')]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    # Function to return a stage's output, computing only stale stages
+    def run(self, name, **params):
+        stage = self.stages[name]
+        key = self.key(name, params)
+        cache = self._cache[name]
+        if key in cache:
+            return cache.get(key)
+        cache.misses += 1
+
+        input_values = [self.run(upstream, **params) for upstream in stage.inputs]
+        kwargs = {p.lstrip('_'): params[p] for p in stage.params}
+        if stage.pass_input_keys:
+            kwargs['input_keys'] = tuple(self.key(upstream, params) for upstream in stage.inputs)
+        started = time.perf_counter()
+        value = stage.func(*input_values, **kwargs)
+        self._last_seconds[name] = time.perf_counter() - started
+
+        cache.put(key, value)
+        return value
+
+    # Function to report per-stage cache state for display
+    def cache_info(self):
+        rows = []
+        for name, stage in self.stages.items():
+            cache = self._cache[name]
+            rows.append({
+                'Stage': name,
+                'Inputs': ', '.join(stage.inputs + stage.params),
+                'Cached_Entries': len(cache),
+                'Hits': cache.hits,
+                'Misses': cache.misses,
+                'Last_Compute_Seconds': self._last_seconds[name],
+            })
+        return rows
+
+    # Function to drop cached outputs for one stage or for all stages
+    def clear(self, name=None):
+        for stage_name in ([name] if name else self.stages):
+            self._cache[stage_name].clear()
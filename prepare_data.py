@@ -1,12 +1,55 @@
 import streamlit as st
 import pandas as pd
+import json
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
+from arrow_sanitizer import sanitize_for_arrow
+from column_profile import get_column_profile_cache
+from description_parser import DESCRIPTION_COLUMNS, add_description_columns
+from excel_export import write_xlsx_streaming
+from export_bundle import build_export_bundle
+from pipeline import LRUCache, Pipeline, Stage
+from quality_rules import evaluate_rules
+from snapshot_store import SnapshotStore, is_manifest
 
-# Set up logging
-log_file = Path(f"trade_data_preparation_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Output folders for cleaned datasets and run logfiles
+CLEANED_DATASETS_DIR = Path("Cleaned_Datasets")
+LOGFILES_DIR = Path("Logfiles")
+
+# Deduplicated snapshot storage for cleaned datasets
+SNAPSHOT_STORE = SnapshotStore(CLEANED_DATASETS_DIR / "snapshots")
+
+# Saved datatype map shared by the Prepare Data page and the batch CLI
+DATATYPE_MAP_FILE = CLEANED_DATASETS_DIR / "datatype_map.json"
+
+# Offer a "Local file path" source that reads files on the server; off by default,
+# since it lets any browser user read any XLSX/CSV the server can see
+ALLOW_LOCAL_FILES = os.environ.get('PREPARE_DATA_ALLOW_LOCAL_FILES', '') == '1'
+
+# Function to set up logging to a timestamped logfile in the Logfiles folder
+def setup_logging(prefix="trade_data_preparation_log"):
+    LOGFILES_DIR.mkdir(exist_ok=True)
+    log_file = LOGFILES_DIR / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    return current_log_file() or log_file
+
+# Function to find the logfile this process is logging to (set up on first run)
+def current_log_file():
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return Path(handler.baseFilename)
+    return None
+
+# Function to read an XLSX or CSV file into a DataFrame
+def read_dataset_file(file, filename):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    if str(filename).endswith('.xlsx'):
+        return pd.read_excel(file)
+    else:
+        return pd.read_csv(file)
 
 # Function to clean column names
 def clean_column_names(df):
@@ -18,15 +61,42 @@ def display_initial_inspection(df):
     st.write("First few rows of the uploaded file:")
     st.write(df.head())
 
+# Function to display each column's nulls, distinct values, range, quartiles and histogram
+# The profile is computed once per dataset version and shared by every session.
+def display_column_profile(df, dataset_version):
+    with st.expander("Column Profile"):
+        try:
+            profile = get_column_profile_cache().get_profile(df, dataset_version)
+        except Exception as e:
+            logging.error(f"Error profiling columns: {str(e)}")
+            st.error(f"Error profiling columns: {str(e)}")
+            return
+        if profile['Approximate'].any():
+            st.caption("Distinct counts and quartiles are estimated from sketches for this large file.")
+        st.dataframe(
+            profile.drop(columns='Approximate'),
+            column_config={'Histogram': st.column_config.BarChartColumn("Histogram")},
+            hide_index=True,
+            use_container_width=True,
+        )
+
 # Function to display column headers and datatypes
 def display_column_headers(df):
     st.subheader("Extracted Column Headers and Datatypes")
     headers_df = pd.DataFrame({
         'Column_Name': df.columns,
-        'Column_Datatype': df.dtypes
+        'Column_Datatype': df.dtypes.astype(str)
     })
     st.dataframe(headers_df)
 
+# Function to report mixed-type columns that were coerced for Arrow
+def display_mixed_type_report(report):
+    if not report:
+        return
+    st.warning(f"{len(report)} columns held mixed value types and were converted to a single type.")
+    with st.expander("Mixed-Type Columns"):
+        st.dataframe(pd.DataFrame(report), use_container_width=True)
+
 # Function to create datatype selection options
 def create_datatype_options(current_type):
     options = []
@@ -40,76 +110,214 @@ def create_datatype_options(current_type):
         options = ['object']
     return options
 
+# Function to convert a single column to a new datatype
+def convert_column(series, new_type):
+    if new_type == 'datetime64':
+        return pd.to_datetime(series, errors='coerce')
+    return series.astype(new_type)
+
 # Function to convert datatypes
-def convert_datatypes(df, datatype_map):
+def convert_datatypes(df, datatype_map, show_errors=True):
     for col, new_type in datatype_map.items():
         try:
-            if new_type == 'datetime64':
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-            else:
-                df[col] = df[col].astype(new_type)
+            df[col] = convert_column(df[col], new_type)
             logging.info(f"Converted column {col} to {new_type}")
         except Exception as e:
             logging.error(f"Error converting column {col} to {new_type}: {str(e)}")
-            st.error(f"Error converting column {col} to {new_type}: {str(e)}")
+            if show_errors:
+                st.error(f"Error converting column {col} to {new_type}: {str(e)}")
     return df
 
+# Function to convert datatypes column by column, reusing cached column results
+# Columns are keyed by (source key, column, target type), where the source key is
+# the upstream stage's cache key, so changing one selectbox converts one column.
+# Returns (DataFrame, error messages). A column that fails to convert is kept
+# unconverted and cached with its error, so the error is reported on every run.
+def convert_datatypes_cached(df, datatype_map, column_cache, input_keys):
+    source_key = input_keys[0]
+    columns = []
+    errors = []
+    for col in df.columns:
+        new_type = datatype_map.get(col)
+        if new_type is None:
+            columns.append(df[col])
+            continue
+        key = (source_key, col, new_type)
+        cached = column_cache.get(key)
+        if cached is None:
+            try:
+                cached = (convert_column(df[col], new_type), None)
+                logging.info(f"Converted column {col} to {new_type}")
+            except Exception as e:
+                cached = (df[col], f"Error converting column {col} to {new_type}: {str(e)}")
+                logging.error(cached[1])
+            column_cache.put(key, cached)
+        converted, error = cached
+        columns.append(converted)
+        if error:
+            errors.append(error)
+    return (pd.concat(columns, axis=1) if columns else df.copy()), errors
+
+# Function to stably sort a dataset by a list of (column, ascending) sort keys
+# Rows that tie on every key keep their original order.
+def sort_dataset(df, sort_keys):
+    sort_keys = [(col, ascending) for col, ascending in sort_keys if col in df.columns]
+    if not sort_keys:
+        return df
+    columns = [col for col, _ in sort_keys]
+    ascending = [bool(asc) for _, asc in sort_keys]
+    sorted_df = df.sort_values(by=columns, ascending=ascending, kind='stable', na_position='last', ignore_index=True)
+    logging.info(f"Sorted dataset by {sort_keys}")
+    return sorted_df
+
 # Function to preview data after datatype conversion
 def preview_data(df, datatype_map):
     st.subheader("Preview of Data After Datatype Conversion")
-    st.write("You can sort the DataFrame by clicking on the column headers.")
-    sorted_df = st.dataframe(df)
-    st.write(df.dtypes)
-    return sorted_df
+    st.write("Sorting by clicking on the column headers is for viewing only; use Sort Dataset to save rows in a sorted order.")
+    st.dataframe(df)
+    st.write(df.dtypes.astype(str))
 
 # Function to save sorted dataset
-def save_sorted_dataset(df, filename):
+def save_sorted_dataset(df, filename, show_messages=True):
     try:
         df.to_csv(filename, index=False)
         logging.info(f"Successfully saved sorted dataset to {filename}")
-        st.success(f"Successfully saved sorted dataset to {filename}")
+        if show_messages:
+            st.success(f"Successfully saved sorted dataset to {filename}")
+        return True
     except Exception as e:
         logging.error(f"Error saving sorted dataset to {filename}: {str(e)}")
-        st.error(f"Error saving sorted dataset to {filename}: {str(e)}")
+        if show_messages:
+            st.error(f"Error saving sorted dataset to {filename}: {str(e)}")
+        return False
 
-# Main function
-def main():
-    st.title("Prepare Data")
+# Function to build the timestamped CSV and XLSX output paths for a cleaned dataset
+def cleaned_dataset_filenames(current_datetime, prefix="trade_performance_dataset_cleaned"):
+    CLEANED_DATASETS_DIR.mkdir(exist_ok=True)
+    csv_filename = CLEANED_DATASETS_DIR / f"{prefix}_{current_datetime}.csv"
+    xlsx_filename = CLEANED_DATASETS_DIR / f"{prefix}_{current_datetime}.xlsx"
+    return csv_filename, xlsx_filename
 
-    # File upload
-    file = st.file_uploader("Upload your XLSX or CSV file", type=["xlsx", "csv"])
-    if not file:
-        st.stop()
+# Function to save a cleaned dataset as a deduplicated snapshot
+def save_dataset_snapshot(df, name, metadata, show_messages=True):
+    try:
+        CLEANED_DATASETS_DIR.mkdir(exist_ok=True)
+        manifest_path, stats = SNAPSHOT_STORE.save(df, name, metadata)
+        if show_messages:
+            st.success(f"Saved snapshot {manifest_path}: {stats['New_Blocks']} of {stats['Blocks']} blocks new, "
+                       f"{stats['Bytes_Written'] / 2**20:.2f} MiB written")
+        return manifest_path
+    except Exception as e:
+        logging.error(f"Error saving snapshot {name}: {str(e)}")
+        if show_messages:
+            st.error(f"Error saving snapshot {name}: {str(e)}")
+        return None
 
-    # Read the file
-    @st.cache_data
-    def read_file(file):
-        try:
-            if file.name.endswith('.xlsx'):
-                return pd.read_excel(file)
-            else:
-                return pd.read_csv(file)
-        except Exception as e:
-            st.error(f"Error reading file: {str(e)}")
-            return None
+# Function to display data-quality rule results with drill-down into violating rows
+def display_quality_checks(df, summary, violations):
+    st.subheader("Data Quality Checks")
+    st.dataframe(summary, use_container_width=True)
+    failing = [rule for rule in violations.columns if violations[rule].any()]
+    if not failing:
+        st.success("No data-quality rule violations found.")
+        return
+    rule = st.selectbox("Show rows violating rule", failing)
+    st.dataframe(df[violations[rule]], use_container_width=True)
 
-    df = read_file(file)
-    if df is None:
+# Function to report descriptions that did not match the expected pattern
+def display_unmatched_descriptions(df, unmatched):
+    count = int(unmatched.sum())
+    if count == 0:
+        st.success("All descriptions were parsed.")
         return
+    st.warning(f"{count} descriptions did not match the expected pattern.")
+    st.dataframe(df.loc[unmatched, ['Description']].value_counts().rename('Rows').reset_index(), use_container_width=True)
 
-    # Clean column names
-    @st.cache_data
-    def clean_columns(df):
-        return clean_column_names(df)
+# Function to get the metadata sidecar path for a saved dataset (CSV and XLSX share one)
+def dataset_metadata_filename(filename):
+    filename = Path(filename)
+    return filename.with_name(f"{filename.stem}.meta.json")
 
-    df = clean_columns(df)
+# Function to build the metadata (datatype map, sort keys) saved with a dataset
+def dataset_metadata(datatype_map, sort_keys, rows, dataset_version=None):
+    return {
+        'saved': datetime.now().isoformat(timespec='seconds'),
+        'rows': rows,
+        'dataset_version': dataset_version,
+        'datatype_map': datatype_map,
+        'sort_keys': [{'column': col, 'ascending': bool(asc)} for col, asc in sort_keys],
+    }
 
-    # Display initial data inspection
-    display_initial_inspection(df)
+# Function to save metadata (datatype map, sort keys) next to a saved dataset
+def save_dataset_metadata(filename, datatype_map, sort_keys, rows, dataset_version=None):
+    metadata = dataset_metadata(datatype_map, sort_keys, rows, dataset_version)
+    metadata_filename = dataset_metadata_filename(filename)
+    with open(metadata_filename, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    logging.info(f"Saved dataset metadata to {metadata_filename}")
+    return metadata_filename
 
-    # Display column headers and datatypes
-    display_column_headers(df)
+# Function to load the metadata saved with a dataset; empty if there is none
+# Snapshots keep their metadata in the manifest instead of a sidecar file.
+def load_dataset_metadata(filename):
+    if is_manifest(filename):
+        return SNAPSHOT_STORE.load_metadata(filename)
+    metadata_filename = dataset_metadata_filename(filename)
+    if not metadata_filename.exists():
+        return {}
+    with open(metadata_filename) as f:
+        return json.load(f)
+
+# Function to check whether saved metadata says a dataset is sorted by a column
+# Only the leading sort key guarantees a column's values are ordered.
+def is_sorted_by(metadata, column, ascending=True):
+    sort_keys = metadata.get('sort_keys') or []
+    return bool(sort_keys) and sort_keys[0]['column'] == column and sort_keys[0]['ascending'] == ascending
+
+# Function to save the selected datatype map so it can be reused headless
+def save_datatype_map(datatype_map, filename=DATATYPE_MAP_FILE):
+    Path(filename).parent.mkdir(exist_ok=True)
+    with open(filename, 'w') as f:
+        json.dump(datatype_map, f, indent=2)
+    logging.info(f"Saved datatype map to {filename}")
 
+# Function to load a saved datatype map
+def load_datatype_map(filename=DATATYPE_MAP_FILE):
+    with open(filename) as f:
+        return json.load(f)
+
+# Function to assign a dataset-version token to an upload
+# The token is fixed at ingest, so cache lookups cost the same for any file size.
+def upload_version(file):
+    return f"upload:{file.file_id}:{file.size}"
+
+# Function to assign a dataset-version token to a file on disk
+def file_version(path):
+    stat = Path(path).stat()
+    return f"file:{Path(path).resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+
+# Function to build the read -> clean columns -> sanitize -> convert -> parse description -> sort pipeline
+# (plus data-quality checks)
+def build_prepare_pipeline(column_cache=None):
+    column_cache = column_cache if column_cache is not None else LRUCache(max_entries=512)
+    return Pipeline([
+        Stage('read', lambda dataset_version, file_name, source: read_dataset_file(source, file_name),
+              params=('dataset_version', 'file_name', '_source')),
+        Stage('clean_columns', clean_column_names, inputs=('read',)),
+        Stage('sanitize', sanitize_for_arrow, inputs=('clean_columns',)),
+        Stage('convert', lambda sanitized, datatype_map, input_keys: convert_datatypes_cached(sanitized[0], datatype_map, column_cache, input_keys),
+              inputs=('sanitize',), params=('datatype_map',), pass_input_keys=True),
+        Stage('parse_description', lambda converted, parse_description: add_description_columns(converted[0], parse_description),
+              inputs=('convert',), params=('parse_description',)),
+        Stage('sort', lambda parsed, sort_keys: sort_dataset(parsed[0], sort_keys), inputs=('parse_description',), params=('sort_keys',)),
+        Stage('quality', evaluate_rules, inputs=('sort',)),
+    ])
+
+# Function to edit the datatype, description parsing and sort settings, and check the result
+# Runs as a fragment, so changing a setting reruns only this section. The settings are
+# written into params in place, where the preview and save panels read them.
+@st.fragment
+def edit_conversion_settings(df, pipeline, params):
     # Create datatype selection options
     datatype_options = {col: create_datatype_options(str(dtype)) for col, dtype in df.dtypes.items()}
 
@@ -122,33 +330,142 @@ def main():
                 current_type = 'datetime64'
             datatype_map[col] = st.selectbox(f"Select datatype for {col}", options, index=options.index(current_type))
 
-    # Preview data after datatype conversion
-    if st.button("Preview Data After Datatype Conversion"):
-        @st.cache_data
-        def convert_and_preview(df, datatype_map):
-            df_converted = convert_datatypes(df.copy(), datatype_map)
-            return df_converted
+        # Save datatype map for the batch CLI
+        if st.button("Save Datatype Map"):
+            save_datatype_map(datatype_map)
+            st.success(f"Saved datatype map to {DATATYPE_MAP_FILE}")
+
+    # Parse the Description field into typed columns
+    parse_description = False
+    if 'Description' in df.columns:
+        parse_description = st.checkbox(f"Parse Description into {', '.join(DESCRIPTION_COLUMNS)}", value=True)
+    params['datatype_map'] = datatype_map
+    params['parse_description'] = parse_description
+
+    # Report failed conversions on every run, including when the conversion is cached
+    _, conversion_errors = pipeline.run('convert', **params)
+    for message in conversion_errors:
+        st.error(message)
+    if parse_description:
+        with st.expander("Description Parsing"):
+            _, unmatched = pipeline.run('parse_description', **params)
+            display_unmatched_descriptions(df, unmatched)
+
+    # Select server-side sort keys; the saved dataset keeps this order
+    with st.expander("Sort Dataset"):
+        sort_options = list(df.columns) + (DESCRIPTION_COLUMNS if parse_description else [])
+        sort_columns = st.multiselect("Sort by columns (in priority order)", sort_options)
+        sort_keys = [[col, st.checkbox(f"Sort {col} ascending", value=True)] for col in sort_columns]
 
-        df_preview = convert_and_preview(df, datatype_map)
-        sorted_df = preview_data(df_preview, datatype_map)
+    # Run the data-quality rules on the converted data
+    params['sort_keys'] = sort_keys
+    with st.expander("Data Quality Checks"):
+        quality_summary, quality_violations = pipeline.run('quality', **params)
+        display_quality_checks(pipeline.run('sort', **params), quality_summary, quality_violations)
 
-        # Save sorted dataset
-        if st.button("Save Sorted Dataset"):
-            current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
-            sorted_csv_filename = f"trade_performance_dataset_sorted_{current_datetime}.csv"
-            save_sorted_dataset(sorted_df, sorted_csv_filename)
+# Function to preview data after datatype conversion and sorting
+# Runs as a fragment, so the preview button reruns only this section.
+@st.fragment
+def preview_panel(pipeline, params):
+    if st.button("Preview Data After Datatype Conversion"):
+        df_preview = pipeline.run('sort', **params)
+        preview_data(df_preview, params['datatype_map'])
+
+# Function to save the cleaned dataset and offer the export bundle download
+# Runs as a fragment, so its widgets rerun only this section.
+@st.fragment
+def save_panel(pipeline, params):
+    datatype_map, sort_keys = params['datatype_map'], params['sort_keys']
 
-    # Save dataset
+    # Save dataset as a snapshot; only blocks that changed since earlier snapshots are written
+    write_files = st.checkbox("Also write full CSV and XLSX files", value=False)
     if st.button("Save Cleaned Dataset"):
         current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
-        csv_filename = f"trade_performance_dataset_cleaned_{current_datetime}.csv"
-        xlsx_filename = f"trade_performance_dataset_cleaned_{current_datetime}.xlsx"
-        
-        df_cleaned = convert_datatypes(df, datatype_map)
-        save_sorted_dataset(df_cleaned, csv_filename)
-        df_cleaned.to_excel(xlsx_filename, index=False)
-        logging.info(f"Successfully saved cleaned dataset to {csv_filename} and {xlsx_filename}")
-        st.success(f"Successfully saved cleaned dataset to {csv_filename} and {xlsx_filename}")
+        df_cleaned = pipeline.run('sort', **params)
+        metadata = dataset_metadata(datatype_map, sort_keys, len(df_cleaned), params['dataset_version'])
+        if save_dataset_snapshot(df_cleaned, f"trade_performance_dataset_cleaned_{current_datetime}", metadata) is None:
+            return
+
+        if write_files:
+            csv_filename, xlsx_filename = cleaned_dataset_filenames(current_datetime)
+            if not save_sorted_dataset(df_cleaned, csv_filename):
+                return
+            write_xlsx_streaming(df_cleaned, xlsx_filename)
+            save_dataset_metadata(csv_filename, datatype_map, sort_keys, len(df_cleaned), params['dataset_version'])
+            logging.info(f"Successfully saved cleaned dataset to {csv_filename} and {xlsx_filename}")
+            st.success(f"Successfully saved cleaned dataset to {csv_filename} and {xlsx_filename}")
+
+    # Download the cleaned dataset, its schema and this run's log as one zip
+    # The bundle is only built when the download button is clicked, from the settings at that time.
+    current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
+    bundle_name = f"trade_performance_dataset_cleaned_{current_datetime}"
+    st.download_button(
+        "Download Export Bundle (Parquet, CSV, schema and log)",
+        data=lambda: build_export_bundle(pipeline.run('sort', **params), params['datatype_map'], params['sort_keys'], current_log_file(), base_name=bundle_name),
+        file_name=f"{bundle_name}.zip",
+        mime="application/zip",
+    )
+
+# Function to get this session's pipeline, which keeps its stage cache across reruns
+def get_prepare_pipeline():
+    if 'prepare_pipeline' not in st.session_state:
+        st.session_state.prepare_column_cache = LRUCache(max_entries=512)
+        st.session_state.prepare_pipeline = build_prepare_pipeline(column_cache=st.session_state.prepare_column_cache)
+    return st.session_state.prepare_pipeline
+
+# Main function
+def main():
+    setup_logging()
+    st.title("Prepare Data")
+
+    # File upload, or (when enabled) a file already on the server (no upload size limit)
+    source = "Upload a file"
+    if ALLOW_LOCAL_FILES:
+        source = st.radio("Source", ["Upload a file", "Local file path"], horizontal=True)
+    if source == "Upload a file":
+        file = st.file_uploader("Upload your XLSX or CSV file", type=["xlsx", "csv"])
+        if not file:
+            st.stop()
+        params = {'dataset_version': upload_version(file), 'file_name': file.name, '_source': file}
+    else:
+        path_text = st.text_input("Path to an XLSX or CSV file").strip()
+        path = Path(path_text)
+        if path.suffix not in ('.xlsx', '.csv') or not path.is_file():
+            if path_text:
+                st.error(f"{path_text} is not an XLSX or CSV file")
+            st.stop()
+        params = {'dataset_version': file_version(path), 'file_name': path.name, '_source': path}
+
+    # Run the read, clean and sanitize stages; all are cached by the source's dataset version
+    pipeline = get_prepare_pipeline()
+    try:
+        df, mixed_report = pipeline.run('sanitize', **params)
+    except Exception as e:
+        st.error(f"Error reading file: {str(e)}")
+        return
+    display_mixed_type_report(mixed_report)
+
+    # Display initial data inspection
+    display_initial_inspection(df)
+    display_column_profile(df, params['dataset_version'])
+
+    # Display column headers and datatypes
+    display_column_headers(df)
+
+    # The datatype editor, preview and save panel are fragments: a widget in one
+    # reruns only that section. They share params, which the editor updates in place.
+    edit_conversion_settings(df, pipeline, params)
+    preview_panel(pipeline, params)
+    save_panel(pipeline, params)
+
+    # Show which pipeline stages are cached
+    with st.expander("Pipeline Cache"):
+        st.dataframe(pd.DataFrame(pipeline.cache_info()), use_container_width=True)
+        column_cache = st.session_state.prepare_column_cache
+        st.write(f"Column conversion cache: {len(column_cache)} columns cached, {column_cache.hits} hits, {column_cache.misses} misses")
+        if st.button("Clear Pipeline Cache"):
+            pipeline.clear()
+            column_cache.clear()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Rolling-window trade analytics for the analyzer.
+
+Win rate, average yield, P/L volatility and drawdown over the last N trades
+or the last N days, computed on the trade frame sorted by date. Every metric
+uses pandas' sliding-window kernels, which update running sums (and a
+monotonic queue for the running maximum) as the window moves, so each series
+costs O(n) whatever the window size. The sorted base frame is cached per
+(dataset version, date column), and each rolling series per (dataset version,
+date column, unit, window), so moving one window slider recomputes only that
+window's series.
+"""
+
+import logging
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from pipeline import LRUCache
+
+# Rolling metrics, in display order
+ROLLING_METRICS = ['Win_Rate', 'Average_Yield', 'Profit_Loss_Volatility', 'Drawdown']
+
+# Function to build the date-sorted base frame the rolling metrics run over
+# Trades without a date are dropped; a missing Profit_Loss counts as 0.
+def sorted_trades(df, date_column):
+    trades = pd.DataFrame({
+        'Date': pd.to_datetime(df[date_column], errors='coerce'),
+        'Profit_Loss': pd.to_numeric(df['Profit_Loss'], errors='coerce').fillna(0.0),
+    })
+    if 'Yield_on_Max_Margin' in df.columns:
+        trades['Yield'] = pd.to_numeric(df['Yield_on_Max_Margin'], errors='coerce')
+    trades = trades[trades['Date'].notna()].sort_values('Date', kind='stable', ignore_index=True)
+    trades['Win'] = (trades['Profit_Loss'] > 0).astype(float)
+    trades['Equity'] = trades['Profit_Loss'].cumsum()
+    return trades
+
+# Function to compute the rolling metrics over the last window trades ('trades') or days ('days')
+# Returns a DataFrame[Date, *ROLLING_METRICS] with one row per trade. Drawdown is
+# the distance of cumulative P/L below its highest value within the window.
+def rolling_metrics(trades, window, unit='trades'):
+    if unit == 'days':
+        frame = trades.set_index('Date')
+        rolling = lambda series, min_periods=1: series.rolling(f'{window}D', min_periods=min_periods)
+    else:
+        frame = trades
+        rolling = lambda series, min_periods=1: series.rolling(window, min_periods=min_periods)
+    metrics = pd.DataFrame({
+        'Win_Rate': rolling(frame['Win']).mean(),
+        'Average_Yield': rolling(frame['Yield']).mean() if 'Yield' in frame.columns else float('nan'),
+        'Profit_Loss_Volatility': rolling(frame['Profit_Loss'], min_periods=2).std(),
+        'Drawdown': frame['Equity'] - rolling(frame['Equity']).max(),
+    })
+    return metrics.reset_index(drop=True).assign(Date=trades['Date'].to_numpy())[['Date'] + ROLLING_METRICS]
+
+# A process-wide cache of sorted base frames and rolling series
+class RollingAnalyticsCache:
+    def __init__(self, max_entries=64):
+        self._results = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._building = {}
+
+    # Function to return a cached result, calling build() on a miss
+    # The cache lock is only held to look up and insert; sessions missing the same key
+    # wait on that key's build lock for one build and count hits, and other keys are not blocked.
+    def _get_or_build(self, key, build):
+        with self._lock:
+            if key in self._results:
+                return self._results.get(key)
+            key_lock = self._building.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                result = self._results.get(key)
+            if result is not None:
+                return result
+            try:
+                result = build()
+                with self._lock:
+                    self._results.put(key, result)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        return result
+
+    # Function to get the rolling metrics for one (dataset version, date column, unit, window)
+    def get_metrics(self, df, dataset_version, date_column, window, unit='trades'):
+        trades = self._get_or_build((dataset_version, date_column), lambda: sorted_trades(df, date_column))
+
+        def build():
+            started = time.perf_counter()
+            metrics = rolling_metrics(trades, window, unit)
+            logging.info(f"Computed rolling {window}-{unit} metrics on {date_column} over {len(trades)} trades in {time.perf_counter() - started:.3f}s")
+            return metrics
+        return self._get_or_build((dataset_version, date_column, unit, window), build)
+
+# Function to get the one rolling analytics cache shared by every session in this process
+@st.cache_resource
+def get_rolling_analytics_cache():
+    return RollingAnalyticsCache()
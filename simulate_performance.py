@@ -0,0 +1,122 @@
+import math
+import os
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import logging
+from monte_carlo import SIMULATION_MODES, band_steps, batch_sizes, combine_batches, percentile_bands, run_simulation, summarize_paths
+from perform_analyzer import load_saved_dataset, select_saved_dataset
+
+# Most times the percentile bands are redrawn while a simulation runs
+MAX_REDRAWS = 10
+
+# Function to get the historical per-trade outcomes to resample
+def trade_outcomes(df, mode):
+    outcomes = pd.to_numeric(df[mode], errors='coerce').dropna().to_numpy()
+    if len(outcomes) == 0:
+        raise ValueError(f"no numeric {mode} values to resample")
+    return outcomes
+
+# Function to draw percentile bands of simulated equity paths
+def plot_bands(bands, steps, paths_done, n_paths):
+    fig = go.Figure()
+    for low, high, opacity in [(5, 95, 0.15), (25, 75, 0.3)]:
+        fig.add_trace(go.Scatter(x=steps, y=bands[high], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=steps, y=bands[low], fill='tonexty', fillcolor=f'rgba(31, 119, 180, {opacity})',
+                                 line=dict(width=0), name=f'P{low}-P{high}'))
+    fig.add_trace(go.Scatter(x=steps, y=bands[50], line=dict(color='rgb(31, 119, 180)'), name='Median'))
+    fig.update_layout(title=f'Simulated Equity ({paths_done} of {n_paths} paths)')
+    fig.update_xaxes(title='Trade')
+    fig.update_yaxes(title='Equity')
+    return fig
+
+# Function to display the statistics of a finished simulation
+def display_summary(summary):
+    st.subheader("Simulation Statistics:")
+    cols = st.columns(4)
+    cols[0].metric("Median Final Equity", f"{summary['Median_Final_Equity']:,.0f}")
+    cols[1].metric("Probability of Loss", f"{summary['Probability_of_Loss']:.1%}")
+    cols[2].metric("Median Max Drawdown", f"{summary['Median_Max_Drawdown']:.1%}")
+    cols[3].metric("Probability of Ruin", f"{summary['Probability_of_Ruin']:.1%}")
+    st.dataframe(pd.DataFrame([summary]).T.rename(columns={0: 'Value'}), use_container_width=True)
+
+# Function to run a simulation, redrawing the percentile bands as batches complete
+# Bands are recomputed over all finished batches in batch order, so the final
+# chart does not depend on the order the workers finish in. Recomputing them
+# costs O(paths done), so they are redrawn at most MAX_REDRAWS times (every k
+# batches and at the end) to keep a run's total work linear in its paths;
+# the progress bar still moves with every batch.
+def run_streamed_simulation(outcomes, settings, chart):
+    progress = st.progress(0.0, text="Simulating...")
+    batches = {}
+    paths_done = 0
+    steps = band_steps(settings['n_trades'])
+    n_batches = len(batch_sizes(settings['n_paths']))
+    redraw_every = math.ceil(n_batches / MAX_REDRAWS)
+    for i, batch in run_simulation(outcomes, settings['n_paths'], settings['n_trades'], settings['seed'],
+                                   mode=settings['mode'], starting_capital=settings['starting_capital'],
+                                   margin_fraction=settings['margin_fraction'], ruin_loss=settings['ruin_loss'],
+                                   workers=settings['workers']):
+        batches[i] = batch
+        paths_done += len(batch['final'])
+        if len(batches) % redraw_every == 0 or len(batches) == n_batches:
+            results = combine_batches(batches)
+            bands = percentile_bands(results['band_equity'])
+            chart.plotly_chart(plot_bands(bands, steps, paths_done, settings['n_paths']), use_container_width=True)
+        progress.progress(paths_done / settings['n_paths'], text=f"Simulated {paths_done} of {settings['n_paths']} paths")
+    progress.empty()
+    return bands, summarize_paths(results, settings['starting_capital'])
+
+# Main function
+def main():
+    st.title("Simulate Trade Performance")
+    st.write("Bootstrap the historical trade outcomes into simulated equity paths to size positions.")
+
+    # Select and load a saved dataset
+    selected_file = select_saved_dataset()
+    if selected_file is None:
+        return
+    df, _ = load_saved_dataset(selected_file)
+    if df is None:
+        return
+
+    # Simulation settings
+    modes = [mode for mode in SIMULATION_MODES if mode in df.columns]
+    if not modes:
+        st.error(f"The dataset has none of the columns {', '.join(SIMULATION_MODES)} to resample.")
+        return
+    settings = {'file': selected_file}
+    settings['mode'] = st.radio("Resample", modes, horizontal=True)
+    cols = st.columns(3)
+    settings['n_paths'] = int(cols[0].number_input("Simulated paths", min_value=100, max_value=100_000, value=5_000, step=1_000))
+    settings['n_trades'] = int(cols[1].number_input("Trades per path", min_value=1, max_value=5_000, value=min(max(len(df), 1), 5_000)))
+    settings['seed'] = int(cols[2].number_input("Random seed", min_value=0, value=42))
+    cols = st.columns(3)
+    settings['starting_capital'] = float(cols[0].number_input("Starting capital", min_value=1.0, value=100_000.0, step=10_000.0))
+    settings['ruin_loss'] = cols[1].slider("Ruin at loss of", min_value=0.05, max_value=1.0, value=0.5, step=0.05)
+    settings['margin_fraction'] = cols[2].slider("Margin per trade (fraction of equity)", min_value=0.01, max_value=1.0, value=0.1, step=0.01,
+                                                 disabled=settings['mode'] != 'Yield_on_Max_Margin')
+    settings['workers'] = int(st.number_input("Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1))
+
+    # Run the simulation; results are kept for reruns with the same settings
+    chart = st.empty()
+    simulation = st.session_state.get('simulation')
+    if st.button("Run Simulation"):
+        try:
+            outcomes = trade_outcomes(df, settings['mode'])
+            bands, summary = run_streamed_simulation(outcomes, settings, chart)
+            simulation = st.session_state.simulation = {'settings': settings, 'bands': bands, 'summary': summary}
+            logging.info(f"Simulation finished: {summary}")
+        except Exception as e:
+            logging.error(f"Error running simulation: {str(e)}")
+            st.error(f"Error running simulation: {str(e)}")
+            return
+    elif simulation is not None and simulation['settings'] == settings:
+        chart.plotly_chart(plot_bands(simulation['bands'], band_steps(settings['n_trades']), settings['n_paths'], settings['n_paths']),
+                           use_container_width=True)
+    if simulation is None or simulation['settings'] != settings:
+        return
+    display_summary(simulation['summary'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Row-level diff between two cleaned dataset snapshots.
+
+Every row of both snapshots is reduced to one 64-bit hash over the columns
+they share (pandas' vectorized hash_pandas_object), then the snapshots are
+hash-joined on the key column (Trade by default). Keys found on one side only
+are added or removed rows; matched rows whose hashes differ are compared
+column by column, with one vectorized comparison per column over just those
+rows, to list exactly which values changed. Repeated keys are matched in
+order of appearance.
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+# Function to hash each row over the given columns
+def row_hashes(df, columns):
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+# Function to build the join table for one snapshot: key, occurrence, row hash and row position
+def keyed_rows(df, key, columns):
+    return pd.DataFrame({
+        key: df[key].to_numpy(),
+        '_occurrence': df.groupby(key, dropna=False, sort=False).cumcount().to_numpy(),
+        '_hash': row_hashes(df, columns),
+        '_position': np.arange(len(df)),
+    })
+
+# Function to mark the cells that differ between two aligned arrays (missing equals missing)
+def changed_cells(old_values, new_values):
+    old_missing = pd.isna(old_values)
+    new_missing = pd.isna(new_values)
+    try:
+        equal = np.asarray(old_values == new_values, dtype=bool)
+    except (TypeError, ValueError):
+        equal = np.asarray(old_values.astype(str) == new_values.astype(str), dtype=bool)
+    return ~((equal & ~old_missing & ~new_missing) | (old_missing & new_missing))
+
+# Function to list per-column changes for matched rows
+# Returns (changes, changed_rows): a long DataFrame[key, Column, Old_Value, New_Value]
+# with one row per changed cell, and a mask of the matched rows with any change.
+# Values are taken from the pandas arrays, so datetimes are reported as Timestamps
+# (a datetime64 NumPy array cast to object would give integer nanoseconds).
+def column_changes(old, new, key, columns, old_positions, new_positions):
+    keys = new[key].to_numpy()[new_positions]
+    changes = []
+    changed_rows = np.zeros(len(new_positions), dtype=bool)
+    for col in columns:
+        old_values = old[col].array[old_positions]
+        new_values = new[col].array[new_positions]
+        mask = changed_cells(old_values, new_values)
+        changed_rows |= mask
+        if mask.any():
+            changes.append(pd.DataFrame({key: keys[mask], 'Column': col,
+                                         'Old_Value': old_values[mask].astype(object), 'New_Value': new_values[mask].astype(object)}))
+    if not changes:
+        return pd.DataFrame(columns=[key, 'Column', 'Old_Value', 'New_Value']), changed_rows
+    return pd.concat(changes, ignore_index=True), changed_rows
+
+# Function to diff two snapshots on a key column
+# Returns a dict with the added, removed and modified rows, the per-column changes,
+# the columns present in only one snapshot, and summary counts.
+def diff_snapshots(old, new, key='Trade'):
+    started = time.perf_counter()
+    if key not in old.columns or key not in new.columns:
+        raise ValueError(f"key column {key} is missing from one of the snapshots")
+    columns = [col for col in new.columns if col in old.columns and col != key]
+
+    joined = keyed_rows(old, key, columns).merge(keyed_rows(new, key, columns), on=[key, '_occurrence'],
+                                                 how='outer', suffixes=('_old', '_new'), indicator=True)
+    removed_positions = joined.loc[joined['_merge'] == 'left_only', '_position_old'].astype(int).to_numpy()
+    added_positions = joined.loc[joined['_merge'] == 'right_only', '_position_new'].astype(int).to_numpy()
+    candidates = joined[(joined['_merge'] == 'both') & (joined['_hash_old'] != joined['_hash_new'])]
+
+    # A hash mismatch can come from a dtype change alone, so only rows with a changed value count as modified
+    candidate_positions = candidates['_position_new'].astype(int).to_numpy()
+    changes, changed_rows = column_changes(old, new, key, columns, candidates['_position_old'].astype(int).to_numpy(),
+                                           candidate_positions)
+    modified_positions = np.sort(candidate_positions[changed_rows])
+
+    result = {
+        'added': new.iloc[np.sort(added_positions)],
+        'removed': old.iloc[np.sort(removed_positions)],
+        'modified': new.iloc[modified_positions],
+        'changes': changes,
+        'columns_added': [col for col in new.columns if col not in old.columns],
+        'columns_removed': [col for col in old.columns if col not in new.columns],
+        'summary': {
+            'Old_Rows': len(old),
+            'New_Rows': len(new),
+            'Added': len(added_positions),
+            'Removed': len(removed_positions),
+            'Modified': len(modified_positions),
+            'Changed_Cells': len(changes),
+        },
+    }
+    logging.info(f"Diffed snapshots on {key} in {time.perf_counter() - started:.3f}s: {result['summary']}")
+    return result
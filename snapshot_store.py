@@ -0,0 +1,154 @@
+"""
+Content-addressed, deduplicated storage for cleaned dataset snapshots.
+
+A snapshot is split into blocks of one column by a run of rows. Each block
+is named by a SHA-256 of its dtype and its values' 64-bit hashes, and stored
+once as a small Parquet file under blocks/; a block that already exists is
+not written again. The snapshot itself is a JSON manifest listing the block
+names of every column plus the dataset metadata, so saving a dataset that
+differs from an earlier snapshot in a few rows or columns writes only the
+blocks that changed. Loading reads a snapshot's blocks in parallel and
+joins them back into the original frame.
+
+Block boundaries are content-defined: a block ends after a row whose hash
+matches a fixed pattern (subject to a minimum and maximum block length), and
+every column is cut at the same rows. Because the cut points follow the rows'
+contents rather than their positions, inserting, removing or editing rows
+anywhere - such as a new trade at the top of a newest-first broker export -
+changes only the blocks those rows fall in, and the rows keep their order.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Average, minimum and maximum rows per block, and the suffix of snapshot manifest files
+BLOCK_ROWS = 4_096
+MIN_BLOCK_ROWS = 1_024
+MAX_BLOCK_ROWS = 16_384
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Function to name a block by the hash of its dtype and values
+def block_hash(series):
+    digest = hashlib.sha256(f"{series.dtype}:{len(series)}".encode())
+    digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+# Function to choose the row offsets where a frame's blocks start and end
+# A block ends after a row whose hash is divisible by BLOCK_ROWS - MIN_BLOCK_ROWS,
+# once it has at least MIN_BLOCK_ROWS rows; a block reaching MAX_BLOCK_ROWS rows
+# is cut regardless. Returns [0, end_1, ..., len(df)].
+def block_bounds(df):
+    n = len(df)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    candidates = np.flatnonzero(row_hashes % np.uint64(BLOCK_ROWS - MIN_BLOCK_ROWS) == 0) + 1
+    bounds = [0]
+    for end in candidates[candidates < n].tolist() + [n]:
+        while end - bounds[-1] > MAX_BLOCK_ROWS:
+            bounds.append(bounds[-1] + MAX_BLOCK_ROWS)
+        if end - bounds[-1] >= MIN_BLOCK_ROWS or (end == n and end > bounds[-1]):
+            bounds.append(end)
+    return bounds
+
+# Function to check whether a path is a snapshot manifest
+def is_manifest(path):
+    return str(path).endswith(MANIFEST_SUFFIX)
+
+# Storage for snapshot manifests and their shared blocks under one folder
+class SnapshotStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.blocks_dir = self.root / 'blocks'
+
+    def block_path(self, digest):
+        return self.blocks_dir / digest[:2] / f"{digest}.parquet"
+
+    def manifest_path(self, name):
+        return self.root / f"{name}{MANIFEST_SUFFIX}"
+
+    # Function to write one block unless a block with the same hash is already stored
+    # Returns the number of bytes written (0 for a block that was already stored).
+    def _write_block(self, digest, series):
+        path = self.block_path(digest)
+        if path.exists():
+            return 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.tmp{os.getpid()}')
+        pq.write_table(pa.Table.from_pandas(series.to_frame('values'), preserve_index=False), tmp_path)
+        os.replace(tmp_path, path)
+        return path.stat().st_size
+
+    # Function to save a DataFrame as a snapshot, writing only blocks not already stored
+    # Returns (manifest_path, stats) with the block counts and bytes written.
+    def save(self, df, name, metadata=None):
+        started = time.perf_counter()
+        columns = []
+        stats = {'Blocks': 0, 'New_Blocks': 0, 'Bytes_Written': 0}
+        bounds = block_bounds(df)
+        for col in df.columns:
+            series = df[col].reset_index(drop=True)
+            blocks = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                block = series.iloc[start:end]
+                digest = block_hash(block)
+                written = self._write_block(digest, block)
+                blocks.append(digest)
+                stats['Blocks'] += 1
+                stats['New_Blocks'] += written > 0
+                stats['Bytes_Written'] += written
+            columns.append({'name': col, 'dtype': str(series.dtype), 'blocks': blocks})
+
+        manifest = {
+            'name': name,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(df),
+            'block_rows': BLOCK_ROWS,
+            'columns': columns,
+            'metadata': metadata or {},
+        }
+        manifest_path = self.manifest_path(name)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        stats['Bytes_Written'] += manifest_path.stat().st_size
+        logging.info(f"Saved snapshot {name}: {stats['New_Blocks']} of {stats['Blocks']} blocks new, "
+                     f"{stats['Bytes_Written']} bytes written in {time.perf_counter() - started:.3f}s")
+        return manifest_path, stats
+
+    # Function to read one block back into a Series
+    def _read_block(self, digest):
+        return pq.read_table(self.block_path(digest)).to_pandas()['values']
+
+    # Function to rebuild the DataFrame a manifest describes, reading its blocks in parallel
+    def load_manifest(self, manifest_path):
+        started = time.perf_counter()
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        digests = sorted({digest for col in manifest['columns'] for digest in col['blocks']})
+        with ThreadPoolExecutor() as executor:
+            blocks = dict(zip(digests, executor.map(self._read_block, digests)))
+
+        data = {}
+        for col in manifest['columns']:
+            parts = [blocks[digest] for digest in col['blocks']]
+            series = pd.concat(parts, ignore_index=True) if parts else pd.Series([], dtype=object)
+            if str(series.dtype) != col['dtype']:
+                series = series.astype(col['dtype'])
+            data[col['name']] = series
+        df = pd.DataFrame(data, index=pd.RangeIndex(manifest['rows']))
+        logging.info(f"Loaded snapshot {manifest['name']} ({len(digests)} blocks) in {time.perf_counter() - started:.3f}s")
+        return df
+
+    # Function to read the metadata saved in a manifest
+    def load_metadata(self, manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f).get('metadata', {})
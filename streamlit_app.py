@@ -4,7 +4,7 @@ st.set_page_config(page_title="Trade Performance Analyzer", layout="wide")
 
 # Navigation
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["Trade Performance Analyzer", "Prepare Data", "Analyze Trade Performance"])
+page = st.sidebar.radio("Go to", ["Trade Performance Analyzer", "Prepare Data", "Analyze Trade Performance", "Simulate Trade Performance", "Compare Dataset Snapshots"])
 
 # Check for query parameters to handle button navigation
 # Replace st.experimental_get_query_params with st.query_params
@@ -20,4 +20,10 @@ elif page == "Prepare Data":
     prepare_data.main()
 elif page == "Analyze Trade Performance":
     import perform_analyzer
-    perform_analyzer.main()
\ No newline at end of file
+    perform_analyzer.main()
+elif page == "Simulate Trade Performance":
+    import simulate_performance
+    simulate_performance.main()
+elif page == "Compare Dataset Snapshots":
+    import compare_snapshots
+    compare_snapshots.main()
\ No newline at end of file
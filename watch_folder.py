@@ -0,0 +1,197 @@
+"""
+Watch-folder ingestion for broker exports.
+
+A background thread polls a folder for new or changed XLSX/CSV exports and
+runs each one through the Prepare Data pipeline with the saved datatype map,
+saving the result as a snapshot. Snapshots are listed by the analyzer pages,
+so dropped files show up there without being uploaded. A file is ingested
+once its size and modification time are unchanged between two polls (so
+partly written files are skipped); the (mtime, size) of every ingested file
+is kept in a state file, so restarting the watcher does not re-ingest them.
+A file that fails to ingest is skipped until its size or modification time
+changes, or the watcher is restarted.
+
+The Trade Performance Analyzer page only shows the watch-folder controls when
+WATCH_FOLDER_ALLOW_PANEL=1, since they let any browser user point the server
+at any folder it can read; otherwise run the watcher from the command line.
+
+Usage:
+    python watch_folder.py exports/ --dtype-map Cleaned_Datasets/datatype_map.json --sort-by Opened,Trade --interval 30
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+
+import prepare_data
+from batch_prepare import find_export_files, parse_sort_keys, process_file
+
+# Default polling interval, and the file recording which exports were ingested
+DEFAULT_INTERVAL_SECONDS = 30
+WATCH_STATE_FILE = prepare_data.CLEANED_DATASETS_DIR / "watch_folder_state.json"
+
+# Offer the watch-folder controls in the app; off by default, like Prepare Data's local file source
+ALLOW_WATCH_FOLDER_PANEL = os.environ.get('WATCH_FOLDER_ALLOW_PANEL', '') == '1'
+
+# Function to identify a file's current version by modification time and size
+def file_signature(path):
+    stat = Path(path).stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+# A polling watcher that ingests new or changed exports on a background thread
+class WatchFolderIngester:
+    def __init__(self, state_file=WATCH_STATE_FILE):
+        self.state_file = Path(state_file)
+        self.watch_dir = None
+        self.datatype_map_file = prepare_data.DATATYPE_MAP_FILE
+        self.sort_keys = []
+        self.interval = DEFAULT_INTERVAL_SECONDS
+        self.last_poll = None
+        self.last_error = None
+        self.results = []
+        self._ingested = self._load_state()
+        self._failed = {}
+        self._pending = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        if not self.state_file.exists():
+            return {}
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def _save_state(self):
+        self.state_file.parent.mkdir(exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self._ingested, f, indent=2)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # Function to start polling a folder; a running watcher is restarted with the new settings
+    def start(self, watch_dir, datatype_map_file=prepare_data.DATATYPE_MAP_FILE, sort_keys=(), interval=DEFAULT_INTERVAL_SECONDS):
+        self.stop()
+        self.watch_dir = Path(watch_dir)
+        self.datatype_map_file = Path(datatype_map_file)
+        self.sort_keys = [list(key) for key in sort_keys]
+        self.interval = interval
+        self._failed = {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watch-folder-ingester", daemon=True)
+        self._thread.start()
+        logging.info(f"Watching {self.watch_dir} for exports every {interval}s")
+
+    def stop(self):
+        if self.is_running():
+            self._stop.set()
+            self._thread.join()
+            logging.info(f"Stopped watching {self.watch_dir}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logging.error(f"Error polling watch folder {self.watch_dir}: {str(e)}")
+            self._stop.wait(self.interval)
+
+    # Function to find exports that are new or changed and have stopped changing
+    # A file seen with a new signature is held back until the next poll sees it unchanged;
+    # a file that failed is skipped while its signature is the one that failed.
+    def ready_files(self):
+        ready = []
+        pending = {}
+        for path in find_export_files(self.watch_dir, '*'):
+            key = str(path.resolve())
+            signature = file_signature(path)
+            if self._ingested.get(key) == signature or self._failed.get(key) == signature:
+                continue
+            if self._pending.get(key) == signature:
+                ready.append(path)
+            else:
+                pending[key] = signature
+        self._pending = pending
+        return ready
+
+    # Function to poll the folder once and ingest every ready export
+    def poll(self):
+        with self._lock:
+            self.last_poll = datetime.now().isoformat(timespec='seconds')
+            files = self.ready_files()
+            if not files:
+                return []
+            datatype_map = prepare_data.load_datatype_map(self.datatype_map_file)
+            results = []
+            for path in files:
+                signature = file_signature(path)
+                current_datetime = datetime.now().strftime('%Y%m%d_%H%M%S')
+                result = process_file(path, datatype_map, self.sort_keys, True, True, current_datetime)
+                result['ingested'] = datetime.now().isoformat(timespec='seconds')
+                results.append(result)
+                key = str(path.resolve())
+                if result['status'] == 'ok':
+                    self._ingested[key] = signature
+                    self._failed.pop(key, None)
+                else:
+                    self._failed[key] = signature
+                logging.info(f"Watch folder ingested {path.name}: {result['status']}")
+            self._save_state()
+            self.results = (results + self.results)[:50]
+            return results
+
+    # Function to report the watcher's state for display
+    def status(self):
+        return {
+            'Running': self.is_running(),
+            'Folder': str(self.watch_dir) if self.watch_dir else None,
+            'Interval_Seconds': self.interval,
+            'Last_Poll': self.last_poll,
+            'Files_Ingested': len(self._ingested),
+            'Files_Failed': len(self._failed),
+            'Last_Error': self.last_error,
+        }
+
+# Function to get the one watcher shared by every session in this process
+@st.cache_resource
+def get_watch_folder_ingester():
+    return WatchFolderIngester()
+
+# Function to parse command-line arguments
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest new or changed exports dropped into a folder.")
+    parser.add_argument('watch_dir', help="Folder to watch for XLSX/CSV exports")
+    parser.add_argument('--dtype-map', default=str(prepare_data.DATATYPE_MAP_FILE),
+                        help="JSON datatype map saved from the Prepare Data page")
+    parser.add_argument('--sort-by', default='',
+                        help="Comma-separated sort columns, prefix with '-' for descending (e.g. Opened,-Trade)")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL_SECONDS, help="Seconds between polls")
+    return parser.parse_args(argv)
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    log_file = prepare_data.setup_logging(prefix="watch_folder_log")
+    ingester = WatchFolderIngester()
+    ingester.start(args.watch_dir, args.dtype_map, parse_sort_keys(args.sort_by), args.interval)
+    print(f"Watching {args.watch_dir} every {args.interval}s, log written to {log_file} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        ingester.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())